@@ -0,0 +1,104 @@
+#
+# Copyright (c) 2022-2024 Pertti Palo.
+#
+# This file is part of Computer Assisted Segmentation Tools
+# (see https://github.com/giuthas-speech-research-tools/cast/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# The example data packaged with this program is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License. You should have received a
+# copy of the Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License along with the data. If not,
+# see <https://creativecommons.org/licenses/by-nc-sa/4.0/> for details.
+#
+# When using the toolkit for scientific publications, please cite the
+# articles listed in README.markdown. They can also be found in
+# citations.bib in BibTeX format.
+#
+"""
+Compare reading and writing TextGrids with CAST's textgrid_io and the
+textgrids package.
+
+Run from the root of the repository with
+
+    python -m devel.textgrid_io_benchmark [number of intervals]
+
+A synthetic TextGrid with four interval tiers is written into a temporary
+directory and read and written a few times with both libraries.
+"""
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from textgrids import TextGrid
+
+from source.computer_assisted_segmentation_tools.textgrid_io import (
+    BINARY, TextGridArrays, TierArrays, read_textgrid, write_textgrid)
+
+
+def make_grid(number_of_intervals: int) -> TextGridArrays:
+    """Make a TextGrid with four tiers of number_of_intervals intervals."""
+    grid = TextGridArrays(xmin=0.0, xmax=number_of_intervals * 0.1)
+    times = [i * 0.1 for i in range(number_of_intervals + 1)]
+    for name in ["Utterance", "Word", "Segments", "Phonetic detail"]:
+        texts = ['' if i % 2 else f"label{i % 50}"
+                 for i in range(number_of_intervals)]
+        grid.add_tier(TierArrays.from_texts(
+            name, times[:-1], times[1:], texts, xmax=grid.xmax))
+    return grid
+
+
+def main(number_of_intervals: int = 100000, repeats: int = 3):
+    """Time both libraries on a grid with number_of_intervals per tier."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "benchmark.TextGrid"
+        binary_path = Path(directory) / "benchmark_binary.TextGrid"
+        write_textgrid(make_grid(number_of_intervals), path)
+        write_textgrid(make_grid(number_of_intervals), binary_path, BINARY)
+        print(f"{number_of_intervals} intervals on each of 4 tiers, "
+              f"{path.stat().st_size / 2**20:.1f} MiB as text, "
+              f"{binary_path.stat().st_size / 2**20:.1f} MiB as binary, "
+              f"best of {repeats} runs:")
+
+        grid = read_textgrid(path)
+        textgrid = TextGrid(str(path))
+        timings = {
+            "read textgrid_io": lambda: read_textgrid(path),
+            "read textgrids": lambda: TextGrid(str(path)),
+            "write textgrid_io": lambda: write_textgrid(grid, path),
+            "write textgrids": lambda: textgrid.write(str(path)),
+            "read binary": lambda: read_textgrid(binary_path),
+            "write binary": lambda: write_textgrid(grid, binary_path, BINARY),
+        }
+        for name, function in timings.items():
+            best = min(timeit.repeat(function, number=1, repeat=repeats))
+            print(f"    {name:20s} {best:8.3f} s")
+
+        # Sanity check: both read the same intervals.
+        grid = read_textgrid(path)
+        textgrid = TextGrid(str(path))
+        assert list(grid.tiers) == list(textgrid)
+        for name, tier in grid.tiers.items():
+            assert len(tier.begins) == number_of_intervals
+            assert tier.texts == [interval.text for interval in textgrid[name]]
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -32,7 +32,8 @@
 Main API of CAST - Computer Assisted Segmentation Tools
 """
 
-from .audio_processing import high_pass, high_pass_50, detect_beep_and_speech
+from .audio_processing import (
+    detect_beep_and_speech, high_pass, high_pass_50, intensity)
 from .clean_textgrids import remove_empty_intervals_from_textgrids
 from .cli import run_cli
 from .concatenate import concatenate_wavs
@@ -46,3 +47,4 @@ from .meta.rasl_meta import check_and_load_rasl_meta
 from .textgrid_functions import (
     add_tiers, add_tiers_to_textgrid, generate_textgrid
 )
+from .token_table import Token, TokenTable
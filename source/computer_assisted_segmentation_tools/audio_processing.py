@@ -33,42 +33,160 @@ Audio processing functions.
 """
 
 import logging
-from typing import Tuple
+from functools import lru_cache
+from typing import Optional, Tuple, Union
 
 # Numpy and scipy
 import numpy as np
-from scipy.signal import butter, filtfilt, kaiser, sosfilt
+from scipy.signal import butter, sosfilt, sosfiltfilt
+from scipy.signal.windows import kaiser
 
 _audio_logger = logging.getLogger('satkit.audio')
 
 
-def high_pass_50(sampling_frequency) -> dict[str, np.ndarray]:
+@lru_cache(maxsize=None)
+def filter_bank(sampling_frequency: float,
+                cutoff: Union[float, Tuple[float, float]],
+                kind: str, order: int) -> np.ndarray:
+    """
+    Return a Butterworth filter as second-order sections.
+
+    Filters are designed only once per process for each combination of
+    arguments and then served from a cache. The returned array is shared
+    between all callers and must not be modified.
+
+    Parameters
+    ----------
+    sampling_frequency : float
+        Sampling frequency of the signals to be filtered.
+    cutoff : Union[float, Tuple[float, float]]
+        Cutoff frequency in Hz, or a (low, high) pair for band filters.
+    kind : str
+        Filter type as accepted by scipy.signal.butter: 'highpass',
+        'lowpass', 'bandpass' or 'bandstop'.
+    order : int
+        Order of the filter.
+
+    Returns
+    -------
+    np.ndarray
+        The filter as second-order sections for use with sosfilt and
+        sosfiltfilt.
+    """
+    _audio_logger.debug(
+        "Generating %s filter at %s Hz for sampling frequency %s.",
+        kind, cutoff, sampling_frequency)
+    nyq = 0.5 * sampling_frequency
+    if isinstance(cutoff, tuple):
+        critical = [frequency / nyq for frequency in cutoff]
+    else:
+        critical = cutoff / nyq
+    return butter(order, critical, btype=kind, output='sos')
+
+
+def high_pass_50(sampling_frequency) -> np.ndarray:
     """Returns a high-pass filter with a 50Hz stop band. Used for
     filtering the mains frequency away from recorded sound."""
     return high_pass(sampling_frequency, 50)
 
 
-def high_pass(sampling_frequency, stop_band) -> dict[str, np.ndarray]:
+def high_pass(sampling_frequency, stop_band) -> np.ndarray:
     """Returns a high-pass filter with a stop band of sb. Used for
-    filtering the mains frequency away from recorded sound."""
-    _audio_logger.debug("Generating high-pass filter.")
-    stop = (stop_band/(sampling_frequency/2))
-    b, a = butter(10, stop, 'highpass')
-    return {'b': b, 'a': a}
+    filtering the mains frequency away from recorded sound.
 
+    The filter is returned as second-order sections from filter_bank."""
+    return filter_bank(sampling_frequency, stop_band, 'highpass', 10)
 
-def band_pass(sampling_frequency):
-    """Generate a band pass filter for detecting a 1kHz signal."""
-    _audio_logger.debug("Generating band-pass filter.")
-    nyq = 0.5 * sampling_frequency
-    low = 950.0 / nyq
-    high = 1050.0 / nyq
-    sos = butter(1, [low, high], btype='band', output='sos')
-    return sos
+
+def band_pass(sampling_frequency) -> np.ndarray:
+    """Return a band pass filter for detecting a 1kHz signal as second-order
+    sections from filter_bank."""
+    return filter_bank(sampling_frequency, (950.0, 1050.0), 'bandpass', 1)
+
+
+def intensity(signal: np.ndarray, sampling_frequency: float,
+              window_duration: float = 0.001) -> np.ndarray:
+    """
+    Return the Kaiser windowed intensity envelope of a signal in dB.
+
+    The envelope has one value per sample of the signal. Each value is the
+    root mean square of the window of samples centered on it, weighted with a
+    Kaiser window like Praat does. The windowed means are computed by
+    convolving the squared signal with the window, which runs in linear time
+    and memory.
+
+    Parameters
+    ----------
+    signal : np.ndarray
+        The signal as a 1D array.
+    sampling_frequency : float
+        Sampling frequency of the signal.
+    window_duration : float, optional
+        Length of the analysis window in seconds, by default 0.001
+
+    Returns
+    -------
+    np.ndarray
+        The intensity envelope.
+    """
+    signal_length = len(signal)
+    window_length = int(window_duration*sampling_frequency)
+    half_window_length = int(window_length/2)
+
+    # pad with zeros at both ends
+    padded_signal = np.zeros(signal_length + window_length)
+    padded_signal[half_window_length: half_window_length+signal_length] = \
+        np.square(signal)  # squared already for rms, r&m later
+
+    # kaiser windowed samples
+    intensity_window = kaiser(window_length, 20)  # copied from praat
+    # Convolving with the reversed window sums each slice of window_length
+    # samples weighted with the window.
+    windowed_sums = np.convolve(
+        padded_signal, intensity_window[::-1], mode='valid')[:signal_length]
+
+    # The signal is already squared, need to only take mean and root.
+    return 10*np.log(np.sqrt(windowed_sums/window_length))
+
+
+def block_intensity(signal: np.ndarray, sampling_frequency: float,
+                    block_duration: float = 0.001) -> np.ndarray:
+    """
+    Return a decimated intensity envelope of a signal in dB.
+
+    This is a cheap stand-in for intensity when only average energies over
+    long stretches of the signal are needed: There is one value per
+    non-overlapping block of samples, the blocks are not windowed and the
+    signal is not filtered.
+
+    Parameters
+    ----------
+    signal : np.ndarray
+        The signal as a 1D array.
+    sampling_frequency : float
+        Sampling frequency of the signal.
+    block_duration : float, optional
+        Length of a block in seconds, by default 0.001
+
+    Returns
+    -------
+    np.ndarray
+        The intensity envelope with one value per block. A partial block at
+        the end of the signal is discarded.
+    """
+    block_length = max(int(block_duration*sampling_frequency), 1)
+    number_of_blocks = len(signal) // block_length
+    blocks = np.reshape(
+        signal[:number_of_blocks*block_length],
+        (number_of_blocks, block_length)).astype(np.float64)
+    mean_squares = np.mean(np.square(blocks), axis=1)
+    return 10*np.log(np.sqrt(mean_squares))
 
 
 def detect_beep_and_speech(frames: np.ndarray, sampling_frequency: float,
-                           b, a, name: str) -> Tuple[float, bool]:
+                           high_pass_filter: np.ndarray, name: str,
+                           search_window: Optional[float] = None
+                           ) -> Tuple[float, bool]:
     """
     Find a 1kHz 50ms beep at the beginning of a sound sample.
 
@@ -81,58 +199,34 @@ def detect_beep_and_speech(frames: np.ndarray, sampling_frequency: float,
     from that using zero crossings and wave duration to pinpoint
     the onset.
 
+    If search_window is given, the beep is only searched for in that many
+    seconds at the beginning of the sample and speech is detected from the
+    block_intensity of the whole sample. This avoids filtering the whole
+    sample and is much faster for long recordings.
+
     Parameters:
     frames: the sound sample
     sampling_frequency: the sampling frequency of the sound sample
-    b and a: high pass filter parameters to remove the electrical
-        mains' interference
+    high_pass_filter: high pass filter as second-order sections to
+        remove the electrical mains' interference
     name: name identifying the sample. Usually the filename.
-1    """
+    search_window: length of the beginning of the sample to search for the
+        beep in seconds. By default the whole sample is searched.
+    """
 
     _audio_logger.debug(
         "Detecting beep onset and presence of speech in %s.",
         name)
-    hp_signal = filtfilt(b, a, frames)
+    signal_length = len(frames)
+    if search_window is None:
+        search_frames = frames
+    else:
+        search_frames = frames[:int(search_window*sampling_frequency)]
+
     sos = band_pass(sampling_frequency)
-    bp_signal = sosfilt(sos, frames)
+    bp_signal = sosfilt(sos, search_frames)
     bp_signal = sosfilt(sos, bp_signal[::-1])[::-1]
-    signal_length = len(hp_signal)
-
-    # 1 ms window
-    window_length = int(0.001*sampling_frequency)
-    half_window_length = int(window_length/2)
-
-    # pad with zeros at both ends
-    padded_signal = np.zeros(signal_length + window_length)
-    padded_signal[half_window_length: half_window_length+signal_length] = \
-        np.square(hp_signal)  # squared already for rms, r&m later
-    padded_signal2 = np.zeros(signal_length + window_length)
-    padded_signal2[half_window_length: half_window_length+signal_length] = \
-        np.square(bp_signal)  # squared already for rms, r&m later
-
-    # square windowed samples
-    wind_signal = np.zeros((signal_length, window_length))
-    bp_wind_signal = np.zeros((signal_length, window_length))
-    for i in range(window_length):
-        wind_signal[:, i] = padded_signal[i:i+signal_length]
-        bp_wind_signal[:, i] = padded_signal2[i:i+signal_length]
-
-    # kaiser windowed samples
-    intensity_window = kaiser(window_length, 20)  # copied from praat
-    # multiply each window slice with the window
-    wind_signal = np.dot(wind_signal, np.diag(intensity_window))
-    bp_wind_signal = np.dot(bp_wind_signal, np.diag(intensity_window))
-
-    # The signal is already squared, need to only take mean and root.
-    int_signal = 10*np.log(np.sqrt(np.mean(wind_signal, 1)))
-    bp_int_signal = 10*np.log(np.sqrt(np.mean(bp_wind_signal, 1)))
-
-    # Old int_time was used to almost correct the shift caused by windowing.
-    # int_time = np.linspace(0, float(len(hp_signal) +
-    # (window_length%2 - 1)/2.0)/fs, len(int_signal))
-    int_time = np.linspace(0, float(len(hp_signal)) /
-                           sampling_frequency, len(hp_signal))
-    int_signal[int_time < 1] = -80
+    bp_int_signal = intensity(bp_signal, sampling_frequency)
 
     # First form a rough estimate of where the beep is by detecting the first
     # big rise in the band passed signal.
@@ -155,18 +249,42 @@ def detect_beep_and_speech(frames: np.ndarray, sampling_frequency: float,
         np.diff(np.signbit(frames[beep_approx_index:roi_end])))[0]
     beep_index = beep_approx_index + \
         zero_crossings[0] + 1 - int(.001*sampling_frequency)
-    beep = int_time[beep_index]
+
+    # Old int_time was used to almost correct the shift caused by windowing.
+    # int_time = np.linspace(0, float(len(hp_signal) +
+    # (window_length%2 - 1)/2.0)/fs, len(int_signal))
+    # The time of a sample is taken from the same linspace as the intensity
+    # time axis spanning the whole signal.
+    time_step = float(signal_length)/sampling_frequency/(signal_length - 1)
+    beep = beep_index*time_step
 
     # check if the energy before the beep begins is less
     # than the energy after the beep.
     split_point = beep_index + int(.075*sampling_frequency)
-    if len(hp_signal) > split_point:
+    if signal_length <= split_point:
+        # if the signal is very, very short, there is no speech
+        has_speech = False
+    elif search_window is None:
+        hp_signal = sosfiltfilt(high_pass_filter, frames)
+        int_signal = intensity(hp_signal, sampling_frequency)
+        int_time = np.linspace(0, float(len(hp_signal)) /
+                               sampling_frequency, len(hp_signal))
+        int_signal[int_time < 1] = -80
+
         ave_energy_pre_beep = np.sum(int_signal[:beep_index])/beep_index
         ave_energy_post_beep = np.sum(
             int_signal[split_point:])/(len(int_signal)-split_point)
         has_speech = ave_energy_pre_beep < ave_energy_post_beep
     else:
-        # if the signal is very, very short, there is no speech
-        has_speech = False
+        block_length = max(int(.001*sampling_frequency), 1)
+        int_signal = block_intensity(frames, sampling_frequency)
+        int_signal[:int(sampling_frequency) // block_length] = -80
+
+        pre_beep = int_signal[:max(beep_index // block_length, 1)]
+        post_beep = int_signal[split_point // block_length:]
+        if len(post_beep) == 0:
+            has_speech = False
+        else:
+            has_speech = np.mean(pre_beep) < np.mean(post_beep)
 
     return (beep, has_speech)
@@ -28,13 +28,27 @@
 # articles listed in README.markdown. They can also be found in
 # citations.bib in BibTeX format.
 #
+import csv
+import hashlib
+import os
 import pprint
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
 from pathlib import Path
+from typing import Optional
 
-from textgrids import TextGrid, Tier
+import numpy as np
+from textgrids import Tier
+
+from .textgrid_io import (
+    TextGridArrays, TierArrays, decode_textgrid, read_textgrid,
+    write_textgrid, write_textgrid_atomically)
 
 pp = pprint.PrettyPrinter(indent=4)
 
+CLEAN_CACHE_NAME = ".cast_clean_cache.csv"
+CLEAN_CACHE_FIELDS = ['filename', 'mtime_ns', 'size', 'sha256', 'format']
+
 def delete_interval(
     tier: Tier,
     index: int
@@ -55,9 +69,46 @@ def delete_interval(
     tier[index-1].xmax = tier[index].xmax
     del tier[index]
 
+def remove_empty_intervals(tier: TierArrays) -> TierArrays:
+    """
+    Remove empty Intervals apart from the first and last one from a Tier.
+
+    Each removed Interval is merged into the closest preceding Interval that
+    is kept. The whole Tier is handled in one go instead of deleting the
+    Intervals one by one, which would be quadratic in the length of the Tier.
+
+    Parameters
+    ----------
+    tier : TierArrays
+        An interval Tier.
+
+    Returns
+    -------
+    TierArrays
+        The cleaned Tier or tier itself if there was nothing to remove.
+    """
+    if tier.is_point_tier or len(tier) < 3:
+        return tier
+
+    empty_labels = np.array([not label for label in tier.labels], dtype=bool)
+    keep = ~empty_labels[tier.label_indices]
+    keep[0] = keep[-1] = True
+    if keep.all():
+        return tier
+
+    kept = np.flatnonzero(keep)
+    # A kept Interval ends where the Interval right before the next kept one
+    # ends, and the last Interval is always kept.
+    end_index = np.append(kept[1:] - 1, kept[-1])
+    return TierArrays(
+        tier.name, tier.xmin, tier.xmax,
+        tier.begins[kept], tier.ends[end_index], tier.label_indices[kept],
+        tier.labels, tier.is_point_tier)
+
 def remove_empty_intervals_from_grid(
         original_gridfile: Path,
-        output_dir: Path
+        output_dir: Path,
+        textgrid_format: Optional[str] = None
     ):
     """
     Delete all empty Intervals (excpet first and last) in every Tier.
@@ -75,6 +126,9 @@ def remove_empty_intervals_from_grid(
         Path to the TextGrid file.
     output_dir : Path
         Path to the output directory.
+    textgrid_format : Optional[str], optional
+        Format of the new TextGrid, by default None for the format of the
+        original.
     """
     if not original_gridfile.exists():
         print("Error: Original TextGrid file - " + str(original_gridfile) + " - does not exist.")
@@ -82,17 +136,120 @@ def remove_empty_intervals_from_grid(
     if not output_dir.exists():
         output_dir.mkdir()
 
-    grid = TextGrid(original_gridfile)
-    for tier in grid:
-        deletion_list =  []
-        for i, interval in enumerate(grid[tier][1:-1]):
-            if not interval.text:
-                deletion_list.append(i+1)
-        deletion_list.reverse()
-        for i in deletion_list:
-            delete_interval(grid[tier], i)
+    grid = read_textgrid(original_gridfile)
+    remove_empty_intervals_from_tiers(grid)
     output_path = output_dir/original_gridfile.name
-    grid.write(output_path)
+    write_textgrid(grid, output_path, textgrid_format)
+
+
+def remove_empty_intervals_from_tiers(grid: TextGridArrays) -> bool:
+    """
+    Remove empty Intervals from every Tier of grid.
+
+    Returns
+    -------
+    bool
+        True if any Intervals were removed.
+    """
+    changed = False
+    for name, tier in grid.tiers.items():
+        cleaned = remove_empty_intervals(tier)
+        if cleaned is not tier:
+            grid.tiers[name] = cleaned
+            changed = True
+    return changed
+
+
+def clean_textgrid_file(
+        original_gridfile: Path,
+        output_path: Path,
+        textgrid_format: Optional[str] = None,
+        known_sha256: Optional[str] = None
+) -> dict:
+    """
+    Remove empty Intervals from a TextGrid file and write it atomically.
+
+    This is the unit of work of remove_empty_intervals_from_textgrids and is
+    run in worker processes.
+
+    Parameters
+    ----------
+    original_gridfile : Path
+        Path to the TextGrid file.
+    output_path : Path
+        Where to write the cleaned TextGrid. May be original_gridfile.
+    textgrid_format : Optional[str], optional
+        Format of the new TextGrid, by default None for the format of the
+        original.
+    known_sha256 : Optional[str], optional
+        Hash of the content the file had when it was last cleaned, by
+        default None. If the content still has the same hash, the file is
+        not cleaned again.
+
+    Returns
+    -------
+    dict
+        A row of the clean cache with an additional 'status' which is
+        'cleaned', 'unchanged' or 'skipped'.
+    """
+    with open(original_gridfile, 'rb') as textgrid_file:
+        data = textgrid_file.read()
+    sha256 = hashlib.sha256(data).hexdigest()
+    in_place = output_path == original_gridfile
+
+    if sha256 == known_sha256 and (in_place or output_path.exists()):
+        status = 'skipped'
+    else:
+        grid = decode_textgrid(data)
+        changed = remove_empty_intervals_from_tiers(grid)
+        converted = (textgrid_format is not None and
+                     textgrid_format != grid.file_format)
+        if in_place and not changed and not converted:
+            status = 'unchanged'
+        else:
+            write_textgrid_atomically(grid, output_path, textgrid_format)
+            status = 'cleaned'
+            if in_place:
+                with open(output_path, 'rb') as textgrid_file:
+                    sha256 = hashlib.sha256(textgrid_file.read()).hexdigest()
+
+    stat = original_gridfile.stat()
+    return {
+        'filename': original_gridfile.name,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': sha256,
+        'format': textgrid_format or '',
+        'status': status,
+    }
+
+
+def read_clean_cache(cache_file: Path) -> dict[str, dict]:
+    """
+    Read the clean cache written by remove_empty_intervals_from_textgrids.
+
+    Returns
+    -------
+    dict[str, dict]
+        Cache rows keyed by filename. Empty if there is no cache.
+    """
+    if not cache_file.is_file():
+        return {}
+    with closing(open(cache_file, 'r', encoding='utf8')) as csvfile:
+        reader = csv.DictReader(csvfile)
+        return {row['filename']: row for row in reader}
+
+
+def write_clean_cache(cache: dict[str, dict], cache_file: Path) -> None:
+    """Write the clean cache through a temporary file."""
+    temp_file = cache_file.with_name(cache_file.name + ".tmp")
+    with closing(open(temp_file, 'w', encoding='utf8', newline='')) as csvfile:
+        writer = csv.DictWriter(
+            csvfile, fieldnames=CLEAN_CACHE_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for row in cache.values():
+            writer.writerow(row)
+    os.replace(temp_file, cache_file)
 
 
 # TODO: change this into a generic filtering function which takes a list of
@@ -100,23 +257,86 @@ def remove_empty_intervals_from_grid(
 def remove_empty_intervals_from_textgrids(
         original_dir: Path, 
         output_dir: Path,
+        textgrid_format: Optional[str] = None,
+        jobs: int = 1,
+        in_place: bool = False
     ):
     """
     Remove empty intervals from all TextGrids in the given directory.
 
+    If in_place is True or output_dir is the same as original_dir, the
+    TextGrids are cleaned in place. Every TextGrid is written to a temporary
+    file first and renamed over the old one, so no TextGrid is left half
+    written. The cleaned TextGrids keep the permissions of the originals.
+
+    What was cleaned is recorded in a cache file in output_dir. TextGrids
+    whose modification time and size, or failing that the hash of their
+    content, are the same as when they were last cleaned are skipped.
+
     Parameters
     ----------
     original_dir : Path
         Path to directory which contains the original TextGrids.
     output_dir : Path
-        Path to the output directory.
+        Path to the output directory. Ignored if in_place is True.
+    textgrid_format : Optional[str], optional
+        Format of the new TextGrids, by default None for the format of each
+        original.
+    jobs : int, optional
+        Number of worker processes, by default 1
+    in_place : bool, optional
+        Replace the original TextGrids with the cleaned ones, by default
+        False.
     """
     if not original_dir.exists():
         print("Fatal: Directory of original TextGrids does not exist.")
         exit()
 
-    if not output_dir.exists():
+    if in_place:
+        output_dir = original_dir
+    elif not output_dir.exists():
         output_dir.mkdir()
+    in_place = output_dir.resolve() == original_dir.resolve()
+
+    cache_file = output_dir/CLEAN_CACHE_NAME
+    cache = read_clean_cache(cache_file)
+    fmt = textgrid_format or ''
+
+    work = []
+    skipped = 0
+    with os.scandir(original_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".TextGrid") or not entry.is_file():
+                continue
+            cached = cache.get(entry.name)
+            if cached is not None and cached['format'] != fmt:
+                cached = None
+            stat = entry.stat()
+            original = Path(entry.path)
+            output_path = original if in_place else output_dir/entry.name
+            if (cached is not None and
+                    int(cached['mtime_ns']) == stat.st_mtime_ns and
+                    int(cached['size']) == stat.st_size and
+                    (in_place or output_path.exists())):
+                skipped += 1
+                continue
+            work.append((original, output_path, textgrid_format,
+                         cached['sha256'] if cached else None))
+
+    if jobs > 1 and len(work) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(
+                clean_textgrid_file, *zip(*work),
+                chunksize=max(1, len(work) // (4 * jobs))))
+    else:
+        results = [clean_textgrid_file(*arguments) for arguments in work]
+
+    statuses = {'cleaned': 0, 'unchanged': 0, 'skipped': skipped}
+    for row in results:
+        statuses[row['status']] += 1
+        cache[row['filename']] = row
+    write_clean_cache(cache, cache_file)
 
-    for textgrid in original_dir.glob("*.TextGrid"):
-        remove_empty_intervals_from_grid(textgrid, output_dir)
+    print(f"Cleaned {statuses['cleaned']} TextGrids, "
+          f"{statuses['unchanged']} had nothing to clean and "
+          f"{statuses['skipped']} were already clean.")
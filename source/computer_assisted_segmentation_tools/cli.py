@@ -31,6 +31,7 @@
 #
 
 # import time
+import sys
 
 from .command_line import CastArgumentParser
 from .commands import CommandStrings, process_command
@@ -54,6 +55,14 @@ def run_cli():
         command = CommandStrings(command_string)
         config_filename = cli.args.configuration_filename
         config_dict = read_config_file(config_filename)
+        if cli.args.jobs is not None:
+            if cli.args.jobs < 1:
+                print(f"--jobs should be at least 1, not {cli.args.jobs}. "
+                      "Exiting.")
+                sys.exit()
+            config_dict['jobs'] = cli.args.jobs
+        if cli.args.textgrid_format is not None:
+            config_dict['textgrid_format'] = cli.args.textgrid_format
         path = config_dict['data_directory']
 
         process_command(command=command,
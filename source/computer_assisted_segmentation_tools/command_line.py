@@ -98,6 +98,25 @@ class CastArgumentParser:
             help=helptext,
             metavar="file")
 
+        helptext = (
+            "Number of parallel worker processes to use. "
+            "Overrides the number of jobs in the config file."
+        )
+        self.parser.add_argument(
+            "-j", "--jobs", type=int, dest="jobs",
+            help=helptext,
+            metavar="N")
+
+        helptext = (
+            "Format of the TextGrids written: long, short, or binary. "
+            "Overrides the TextGrid format in the config file. By default "
+            "TextGrids are written in the format they were read in."
+        )
+        self.parser.add_argument(
+            "--textgrid_format", dest="textgrid_format",
+            choices=["long", "short", "binary"],
+            help=helptext)
+
         helptext = (
             'Set verbosity of console output. Range is [0, 3], default is 1, '
             'larger values mean greater verbosity.'
@@ -36,7 +36,7 @@ from pathlib import Path
 import sys
 
 from .clean_textgrids import remove_empty_intervals_from_textgrids
-from .concatenate import concatenate_wavs
+from .concatenate import append_wavs, concatenate_wavs
 from .configuration import read_pronunciation_dict
 from .extract import extract_textgrids
 from .path_functions import initialise_dataset
@@ -66,6 +66,7 @@ class CommandStrings(ExtendedEnum):
     Commands accepted by CAST as strings.
     """
     ADD = 'add'
+    APPEND = 'append'
     CONCATENATE = 'concatenate'
     EXTRACT = 'extract'
     INITIALISE = 'init'
@@ -101,15 +102,31 @@ def process_command(command: CommandStrings, path: Path, config_dict: dict):
                 config_dict['pronunciation dictionary'])
         concatenate_wavs(
             path, config_dict, pronunciation_dict)
+    elif command is CommandStrings.APPEND:
+        pronunciation_dict = None
+        if not config_dict['flags']['only words']:
+            pronunciation_dict = read_pronunciation_dict(
+                config_dict['pronunciation dictionary'])
+        append_wavs(
+            path, config_dict, pronunciation_dict)
     elif command is CommandStrings.REMOVE_DOUBLE_WORD_BOUNDARIES:
-        if not config_dict['output_dirname']:
+        in_place = config_dict['clean_in_place']
+        if not in_place and not config_dict.get('output_dirname'):
             print(
                 'Fatal: No output directory for new textgrids specified in '
                 'config file.')
+            sys.exit()
         remove_empty_intervals_from_textgrids(
-            Path(path), Path(config_dict['output_dirname']))
+            Path(path), Path(config_dict.get('output_dirname') or path),
+            textgrid_format=config_dict.get('textgrid_format'),
+            jobs=config_dict['jobs'], in_place=in_place)
     elif command is CommandStrings.EXTRACT:
-        extract_textgrids(Path(path), Path(config_dict['outputfile']))
+        extract_textgrids(
+            Path(path), Path(config_dict['outputfile']),
+            tier_names=config_dict.get('extract_tiers'),
+            threads=config_dict['extract_threads'],
+            overwrite=config_dict['extract_overwrite'],
+            textgrid_format=config_dict.get('textgrid_format'))
     else:
         print(f"Did not recognise the command {command}. Exiting.")
         sys.exit()
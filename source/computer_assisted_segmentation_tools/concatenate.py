@@ -28,11 +28,13 @@
 # articles listed in README.markdown. They can also be found in
 # citations.bib in BibTeX format.
 #
+import glob
 import pprint
 import sys
+from concurrent.futures import Future, ProcessPoolExecutor
 from contextlib import closing
 from pathlib import Path
-from typing import Optional, Tuple, Union
+from typing import Optional, Sequence, Tuple, Union
 
 import numpy as np
 # wav file handling
@@ -41,16 +43,25 @@ import scipy.io.wavfile as sio_wavfile
 from .meta.cast_meta import get_token_list
 
 from .audio_processing import detect_beep_and_speech, high_pass
-from .textgrid_functions import generate_textgrid
+from .textgrid_functions import append_tokens_to_textgrid, generate_textgrid
+from .textgrid_io import load_textgrid, save_textgrid
 from .configuration import read_exclusion_list
-from .csv_output import write_results
+from .csv_output import (
+    shard_manifest_path, write_results, write_shard_manifest)
+from .extract import read_results_csv, read_shard_manifest
+from .token_table import Token, TokenTable, column, set_column
+from .wav_handling import (
+    WavInfo, WavWriter, needs_rf64, probe_wav, read_wav_frames, sample_width,
+    splice_wavs)
 
 pp = pprint.PrettyPrinter(indent=4)
 
 
-def process_wav_file(table_entry: dict, samplerate: float,
+def process_wav_file(table_entry: Token, samplerate: float,
                      number_of_channels: int, cursor: float,
-                     high_pass_filter: Optional[dict[str, np.ndarray]] = None
+                     high_pass_filter: Optional[np.ndarray] = None,
+                     sample_format: Optional[np.dtype] = None,
+                     search_window: Optional[float] = None
                      ) -> Tuple[float, np.ndarray]:
     (next_samplerate, frames) = sio_wavfile.read(table_entry['wav_path'])
     n_frames = frames.shape[0]
@@ -61,7 +72,7 @@ def process_wav_file(table_entry: dict, samplerate: float,
 
     if next_samplerate != samplerate:
         print('Mismatched sample rates in sound files.')
-        print(f"{next_samplerate} in {table_entry['wav_file']} "
+        print(f"{next_samplerate} in {table_entry['wav_path']} "
               f"is not the common one: {samplerate}")
         print('Exiting.')
         sys.exit()
@@ -69,35 +80,226 @@ def process_wav_file(table_entry: dict, samplerate: float,
     if n_channels != number_of_channels:
         print('Mismatched numbers of channels in sound files.')
         print(
-            f"{n_channels} in {table_entry['wav_file']} "
+            f"{n_channels} in {table_entry['wav_path']} "
             f"is not the common one: {number_of_channels}")
         print('Exiting.')
         sys.exit()
 
-    duration = n_frames / float(samplerate)
+    if sample_format is not None and frames.dtype != sample_format:
+        print('Mismatched sample formats in sound files.')
+        print(
+            f"{frames.dtype} in {table_entry['wav_path']} "
+            f"is not the common one: {sample_format}")
+        print('Exiting.')
+        sys.exit()
 
-    table_entry['sliceBegin'] = cursor
+    duration = n_frames / float(samplerate)
+    next_cursor = add_timing_info(table_entry, cursor, duration)
 
     # setup the high-pass filter for removing the mains frequency (and anything
     # below it) from the recorded sound.
-    if high_pass_filter:
+    if high_pass_filter is not None:
         beep, has_speech = detect_beep_and_speech(
-            frames, samplerate, high_pass_filter['b'],
-            high_pass_filter['a'], table_entry['filename'])
-        table_entry['beep'] = cursor + beep
-        table_entry['has speech'] = has_speech
-        # Start segmentation in FAV and other systems after the beep.
-        table_entry['begin'] = cursor + beep + 0.05
-    else:
-        table_entry['begin'] = cursor
+            frames, samplerate, high_pass_filter, table_entry['filename'],
+            search_window=search_window)
+        add_beep_info(table_entry, beep, has_speech)
+
+    return next_cursor, frames
+
+
+def add_timing_info(table_entry: Token, cursor: float,
+                    duration: float) -> float:
+    """
+    Place a recording at cursor in the concatenated timeline.
+
+    Parameters
+    ----------
+    table_entry : Token
+        Metadata for the recording.
+    cursor : float
+        Where the recording begins in the concatenated file.
+    duration : float
+        Duration of the recording.
+
+    Returns
+    -------
+    float
+        Where the next recording begins.
+    """
+    table_entry['sliceBegin'] = cursor
+    table_entry['begin'] = cursor
     cursor += duration
     table_entry['end'] = round(cursor, 3)
     table_entry['sliceEnd'] = cursor
+    return cursor
+
+
+def add_timing_info_to_table(tokens: Sequence[Token],
+                             cursor: float = 0.0) -> float:
+    """
+    Place recordings one after the other in the concatenated timeline.
+
+    Does the same as calling add_timing_info for each recording in turn, but
+    for all of them at once.
+
+    Parameters
+    ----------
+    tokens : Sequence[Token]
+        Metadata for the recordings with 'wav_info' set.
+    cursor : float, optional
+        Where the first recording begins, by default 0.0
+
+    Returns
+    -------
+    float
+        Where the next recording begins.
+    """
+    durations = np.fromiter(
+        (token['wav_info'].duration for token in tokens),
+        dtype=np.float64, count=len(tokens))
+    # cumsum adds the durations one by one in order, so the boundaries come
+    # out exactly as they would from adding them up in a loop.
+    boundaries = np.cumsum(np.concatenate(([cursor], durations)))
+    set_column(tokens, 'sliceBegin', boundaries[:-1])
+    set_column(tokens, 'begin', boundaries[:-1])
+    set_column(tokens, 'end', np.round(boundaries[1:], 3))
+    set_column(tokens, 'sliceEnd', boundaries[1:])
+    return float(boundaries[-1])
+
+
+def add_beep_info(table_entry: Token, beep: float, has_speech: bool) -> None:
+    """
+    Add the results of beep detection to a table entry.
+
+    Parameters
+    ----------
+    table_entry : Token
+        Metadata for the recording. 'sliceBegin' should already be set.
+    beep : float
+        Beep onset relative to the beginning of the recording.
+    has_speech : bool
+        Whether speech was detected after the beep.
+    """
+    table_entry['beep'] = table_entry['sliceBegin'] + beep
+    table_entry['has speech'] = has_speech
+    # Start segmentation in FAV and other systems after the beep.
+    table_entry['begin'] = table_entry['sliceBegin'] + beep + 0.05
+
+
+def add_beep_info_to_table(tokens: Sequence[Token], beeps: Sequence[float],
+                           has_speech: Sequence[bool]) -> None:
+    """
+    Add the results of beep detection to several tokens at once.
+
+    Does the same as calling add_beep_info for each token in turn.
+
+    Parameters
+    ----------
+    tokens : Sequence[Token]
+        Metadata for the recordings. 'sliceBegin' should already be set.
+    beeps : Sequence[float]
+        Beep onsets relative to the beginning of each recording.
+    has_speech : Sequence[bool]
+        Whether speech was detected after the beep in each recording.
+    """
+    beeps = column(tokens, 'sliceBegin') + np.asarray(beeps, dtype=np.float64)
+    set_column(tokens, 'beep', beeps)
+    set_column(tokens, 'has speech', list(has_speech))
+    # Start segmentation in FAV and other systems after the beep.
+    set_column(tokens, 'begin', beeps + 0.05)
+
+
+def detect_beep_in_wav_file(
+        wav_path: Path, high_pass_filter: np.ndarray, name: str,
+        search_window: Optional[float] = None
+) -> Tuple[float, bool]:
+    """
+    Read a wav file and run beep detection on it.
+
+    This is the unit of work for running beep detection in a process pool, so
+    the worker reads the file itself instead of having the frames pickled over
+    to it.
+
+    Parameters
+    ----------
+    wav_path : Path
+        Path to the wav file.
+    high_pass_filter : np.ndarray
+        High-pass filter for removing the mains frequency as second-order
+        sections.
+    name : str
+        Name identifying the recording.
+    search_window : Optional[float], optional
+        Length of the beginning of the recording to search for the beep in
+        seconds, by default None meaning the whole recording.
+
+    Returns
+    -------
+    Tuple[float, bool]
+        Beep onset relative to the beginning of the file and whether the file
+        contains speech.
+    """
+    samplerate, frames = sio_wavfile.read(wav_path)
+    return detect_beep_and_speech(
+        frames, samplerate, high_pass_filter, name,
+        search_window=search_window)
+
+
+def check_wav_formats(table: Sequence[Token]) -> WavInfo:
+    """
+    Check that all included recordings can be concatenated.
+
+    The headers of all included recordings are read and compared to the
+    first one. Any mismatches in sample rate, number of channels or sample
+    format are reported all at once and the program exits before anything
+    is written. The header info is stored in each entry as 'wav_info'.
+
+    Parameters
+    ----------
+    table : Sequence[Token]
+        The token table.
+
+    Returns
+    -------
+    WavInfo
+        Header info of the first included recording.
+    """
+    reference = None
+    mismatches = []
+    for entry in table:
+        if entry['excluded']:
+            continue
+        try:
+            entry['wav_info'] = probe_wav(entry['wav_path'])
+        except (OSError, ValueError) as error:
+            mismatches.append(f"Could not read {entry['wav_path']}: {error}")
+            continue
+        if reference is None:
+            reference = entry['wav_info']
+        elif not entry['wav_info'].is_compatible_with(reference):
+            wav_info = entry['wav_info']
+            mismatches.append(
+                f"{wav_info.path}: {wav_info.samplerate} Hz, "
+                f"{wav_info.number_of_channels} channel(s), "
+                f"{wav_info.sample_format}")
 
-    return cursor, frames
+    if reference is None:
+        print("No recordings to concatenate. Exiting.")
+        sys.exit()
+    if mismatches:
+        print('Mismatched sound files. The common format is '
+              f"{reference.samplerate} Hz, "
+              f"{reference.number_of_channels} channel(s), "
+              f"{reference.sample_format} from {reference.path}.")
+        for mismatch in mismatches:
+            print(mismatch)
+        print('Exiting.')
+        sys.exit()
+
+    return reference
 
 
-def apply_exclusion_list(table: list[dict], exclusion_path: Path) -> None:
+def apply_exclusion_list(table: Sequence[Token], exclusion_path: Path) -> None:
 
     exclusion_list = read_exclusion_list(exclusion_path)
 
@@ -115,6 +317,8 @@ def apply_exclusion_list(table: list[dict], exclusion_path: Path) -> None:
         # match exclucion criteria (for example excluding 'foobar ...'
         # based on 'foobar').
         prompt = entry['prompt']
+        if prompt is None:
+            continue
         if (prompt in exclusion_list['prompts'] or
                 [element for element in exclusion_list['parts of prompts']
                  if element in prompt]):
@@ -123,6 +327,296 @@ def apply_exclusion_list(table: list[dict], exclusion_path: Path) -> None:
             entry['excluded'] = True
 
 
+def stream_wavs_with_beep_detection(
+        table: Sequence[Token], writer: WavWriter, config_dict: dict,
+        cursor: float = 0.0) -> None:
+    """
+    Concatenate the recordings into writer while running beep detection.
+
+    With more than one job in config_dict, beep detection runs in a process
+    pool. Each worker reads its recording itself rather than having the
+    frames pickled over to it, so every recording is read twice: once by the
+    worker and once by the main process, which writes it into the
+    concatenation. The second read usually comes from the OS page cache.
+
+    Parameters
+    ----------
+    table : Sequence[Token]
+        The token table. Timing and beep info is added to the included
+        entries.
+    writer : WavWriter
+        Writer for the concatenated wav.
+    config_dict : dict
+        Configuration.
+    cursor : float, optional
+        Where the first recording begins in the concatenated wav, by default
+        0.0
+    """
+    samplerate = writer.samplerate
+    number_of_channels = writer.number_of_channels
+
+    # Read wavs and keep track of file boundaries.
+    # TODO: consider moving the whole loop into processWavFile and renaming the function
+    mains_frequency = 60
+    high_pass_filter = high_pass(
+        samplerate, mains_frequency)
+    search_window = config_dict.get('beep_search_window')
+
+    # With more than one job beep detection is farmed out to a process pool.
+    # The time offsets only depend on the durations of the recordings, so the
+    # main process can keep streaming the frames into the output and the
+    # results are added to the table in order once all of the jobs are done.
+    executor = None
+    beep_jobs: list[tuple[Token, Future]] = []
+    if config_dict['jobs'] > 1:
+        executor = ProcessPoolExecutor(max_workers=config_dict['jobs'])
+
+    # Frames are streamed into the output one recording at a time, so only the
+    # current recording is ever held in memory.
+    try:
+        for entry in table:
+            if entry['excluded']:
+                continue
+            sample_format = entry['wav_info'].dtype
+            if executor is not None:
+                beep_jobs.append((entry, executor.submit(
+                    detect_beep_in_wav_file, entry['wav_path'],
+                    high_pass_filter, entry['filename'],
+                    search_window)))
+                cursor, frames = process_wav_file(
+                    entry, samplerate, number_of_channels, cursor,
+                    sample_format=sample_format)
+            else:
+                cursor, frames = process_wav_file(
+                    entry, samplerate, number_of_channels, cursor,
+                    high_pass_filter=high_pass_filter,
+                    sample_format=sample_format,
+                    search_window=search_window)
+            writer.write_samples(frames, entry['wav_info'].sample_format)
+
+        if beep_jobs:
+            entries, jobs = zip(*beep_jobs)
+            beeps, has_speech = zip(*(job.result() for job in jobs))
+            add_beep_info_to_table(entries, beeps, has_speech)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def detect_beeps_in_table(table: Sequence[Token], samplerate: float,
+                          config_dict: dict) -> None:
+    """
+    Run beep detection on the recordings without writing anything.
+
+    append_wavs uses this so that a recording on which beep detection fails
+    stops the run before the existing concatenation is touched. With more
+    than one job in config_dict, the recordings are processed in a process
+    pool.
+
+    Parameters
+    ----------
+    table : Sequence[Token]
+        The token table with 'sliceBegin' set for included entries. Beep info
+        is added to the included entries.
+    samplerate : float
+        Sample rate of the recordings.
+    config_dict : dict
+        Configuration.
+    """
+    mains_frequency = 60
+    high_pass_filter = high_pass(samplerate, mains_frequency)
+    search_window = config_dict.get('beep_search_window')
+
+    included = [entry for entry in table if not entry['excluded']]
+    arguments = (
+        [entry['wav_path'] for entry in included],
+        [high_pass_filter] * len(included),
+        [entry['filename'] for entry in included],
+        [search_window] * len(included))
+    if config_dict['jobs'] > 1:
+        with ProcessPoolExecutor(
+                max_workers=config_dict['jobs']) as executor:
+            results = list(executor.map(detect_beep_in_wav_file, *arguments))
+    else:
+        results = list(map(detect_beep_in_wav_file, *arguments))
+    beeps, has_speech = zip(*results)
+    add_beep_info_to_table(included, beeps, has_speech)
+
+
+# How many frames are converted at a time when the recordings are not in the
+# output sample format.
+FRAMES_PER_BLOCK = 1 << 18
+
+
+def splice_wavs_into(table: Sequence[Token], writer: WavWriter) -> None:
+    """
+    Concatenate the recordings into writer without decoding them.
+
+    Recordings that are not in the sample format of writer are converted one
+    block of frames at a time instead.
+
+    Parameters
+    ----------
+    table : Sequence[Token]
+        The token table with 'wav_info' and timing info set for included
+        entries.
+    writer : WavWriter
+        Writer for the concatenated wav.
+    """
+    for entry in table:
+        if entry['excluded']:
+            continue
+        wav_info = entry['wav_info']
+        if wav_info.sample_format == writer.sample_format:
+            writer.copy_frames_from(wav_info)
+            continue
+
+        if wav_info.sample_format == "int24":
+            # numpy can't memory-map 24-bit samples.
+            frames = sio_wavfile.read(wav_info.path)[1]
+        else:
+            frames = read_wav_frames(wav_info)
+        for begin in range(0, wav_info.frame_count, FRAMES_PER_BLOCK):
+            writer.write_samples(
+                frames[begin:begin + FRAMES_PER_BLOCK],
+                wav_info.sample_format)
+
+
+def split_into_shards(table: Sequence[Token],
+                      max_shard_duration: Optional[float] = None,
+                      max_shard_bytes: Optional[int] = None
+                      ) -> list[TokenTable]:
+    """
+    Split the included recordings into consecutive shards.
+
+    A new shard is started whenever adding the next recording would take the
+    current shard over either limit. A recording that alone exceeds a limit
+    gets a shard of its own.
+
+    Parameters
+    ----------
+    table : Sequence[Token]
+        The token table with 'wav_info' set for included entries.
+    max_shard_duration : Optional[float], optional
+        Maximum duration of a shard in seconds, by default None for no limit.
+    max_shard_bytes : Optional[int], optional
+        Maximum size of the sample data of a shard in bytes, by default None
+        for no limit.
+
+    Returns
+    -------
+    list[TokenTable]
+        The shards in order. Excluded entries are left out.
+    """
+    shards = []
+    shard = TokenTable()
+    duration = 0.0
+    size = 0
+    for entry in table:
+        if entry['excluded']:
+            continue
+        wav_info = entry['wav_info']
+        entry_size = wav_info.frame_count * wav_info.block_align
+        if shard and (
+                (max_shard_duration is not None and
+                 duration + wav_info.duration > max_shard_duration) or
+                (max_shard_bytes is not None and
+                 size + entry_size > max_shard_bytes)):
+            shards.append(shard)
+            shard = TokenTable()
+            duration = 0.0
+            size = 0
+        shard.append(entry)
+        duration += wav_info.duration
+        size += entry_size
+    if shard:
+        shards.append(shard)
+    return shards
+
+
+def concatenate_shard(
+        table: TokenTable, outputfile: Path, wav_info: WavInfo,
+        config_dict: dict, pronunciation_dict: Union[dict, None] = None
+) -> None:
+    """
+    Write the concatenated wav, results csv and TextGrid for recordings.
+
+    Parameters
+    ----------
+    table : TokenTable
+        Included entries of the token table.
+    outputfile : Path
+        Path without suffix for the output files.
+    wav_info : WavInfo
+        The common format of the recordings.
+    config_dict : dict
+        Configuration.
+    pronunciation_dict : Union[dict, None], optional
+        Pronunciation dictionary, by default None
+    """
+    outwave = outputfile.with_suffix(".wav")
+    outcsv = outputfile.with_suffix(".csv")
+    out_textgrid = outputfile.with_suffix(".TextGrid")
+
+    output_format = config_dict.get('output_sample_format')
+    dither = config_dict['dither']
+    if config_dict['flags']['detect beep'] or (
+            output_format not in (None, wav_info.sample_format)):
+        if output_format is None:
+            # Beep detection decodes the samples, so by default they are
+            # written in the format scipy reads them as.
+            output_format = wav_info.dtype.name
+        # Sessions larger than 4 GiB need to be written as RF64.
+        frame_count = sum(entry['wav_info'].frame_count for entry in table)
+        data_size = (frame_count * wav_info.number_of_channels *
+                     sample_width(output_format))
+        with WavWriter(outwave, wav_info.samplerate,
+                       wav_info.number_of_channels, output_format,
+                       rf64=needs_rf64(data_size), dither=dither) as writer:
+            if config_dict['flags']['detect beep']:
+                stream_wavs_with_beep_detection(table, writer, config_dict)
+            else:
+                add_timing_info_to_table(table)
+                splice_wavs_into(table, writer)
+    else:
+        # Without beep detection nothing needs to be decoded and the sample
+        # data can be copied straight into the output.
+        add_timing_info_to_table(table)
+        splice_wavs(outwave, [entry['wav_info'] for entry in table])
+
+    write_results(table, outcsv, config_dict['flags']['detect beep'])
+    generate_textgrid(table, out_textgrid, config_dict, pronunciation_dict)
+
+
+def remove_stale_shard_manifest(outputfile: Path) -> None:
+    """
+    Remove the shard manifest of an earlier sharded concatenation.
+
+    extract and append look for the manifest before the unsharded files, so a
+    manifest left by an earlier run with the same outputfile would make them
+    use the old shards. The old shard files themselves may hold annotations
+    and are only reported, not deleted.
+
+    Parameters
+    ----------
+    outputfile : Path
+        Path of the unsharded concatenation without a suffix.
+    """
+    manifest_file = shard_manifest_path(outputfile)
+    if not manifest_file.is_file():
+        return
+    manifest_file.unlink()
+    print(f"Removed shard manifest {manifest_file} left by an earlier "
+          "sharded concatenation.")
+    pattern = f"{glob.escape(outputfile.name)}_[0-9][0-9][0-9].*"
+    leftovers = sorted(outputfile.parent.glob(pattern))
+    if leftovers:
+        print("Warning: Shard files from the earlier concatenation were "
+              "left in place:")
+        for leftover in leftovers:
+            print(f"\t{leftover}")
+
+
 def concatenate_wavs(directory: Union[str, Path],
                      config_dict: dict,
                      pronunciation_dict: Union[dict, None] = None,
@@ -138,57 +632,165 @@ def concatenate_wavs(directory: Union[str, Path],
 
     apply_exclusion_list(table, Path(config_dict['exclusion list']))
 
-    # Only add the beep entry if we are going to be using it.
-    if config_dict['flags']['detect beep']:
-        for entry in table:
-            entry['beep'] = 'n/a'
+    if only_words:
+        pronunciation_dict = None
 
-    outwave = outputfile.with_suffix(".wav")
-    outcsv = outputfile.with_suffix(".csv")
-    out_textgrid = outputfile.with_suffix(".TextGrid")
+    # Find params from the first file and check that the rest match before
+    # writing anything.
+    wav_info = check_wav_formats(table)
 
-    # find params from first file
-    samplerate, test_data = sio_wavfile.read(table[0]['wav_path'])
-    if len(test_data.shape) == 1:
-        number_of_channels = 1
-    else:
-        number_of_channels = test_data.shape[1]
+    # Long sessions can be split into several shorter concatenations which
+    # each get their own time line starting from zero.
+    shards = split_into_shards(
+        table,
+        max_shard_duration=config_dict.get('max_shard_duration'),
+        max_shard_bytes=config_dict.get('max_shard_bytes'))
 
-    # Read wavs and keep track of file boundaries.
-    # TODO: consider moving the whole loop into processWavFile and renaming the function
-    if config_dict['flags']['detect beep']:
-        mains_frequency = 60
-        high_pass_filter = high_pass(
-            samplerate, mains_frequency)
+    if len(shards) == 1:
+        remove_stale_shard_manifest(outputfile)
+        concatenate_shard(
+            shards[0], outputfile, wav_info, config_dict, pronunciation_dict)
+        return
 
-    cursor = 0.0
-    frames = None
-    for entry in table:
-        if entry['excluded']:
-            continue
-        if config_dict['flags']['detect beep']:
-            cursor, new_frames = process_wav_file(
-                entry, samplerate, number_of_channels, cursor,
-                high_pass_filter=high_pass_filter)
-        else:
-            cursor, new_frames = process_wav_file(
-                entry, samplerate, number_of_channels, cursor)
-        if new_frames is None:
-            continue
-        if frames is None:
-            frames = new_frames
-        else:
-            frames = np.concatenate([frames, new_frames], axis=0)
+    manifest = {}
+    for i, shard in enumerate(shards, start=1):
+        shard_file = outputfile.with_name(f"{outputfile.name}_{i:03d}")
+        print(f"Concatenating shard {shard_file.name} "
+              f"with {len(shard)} recordings.")
+        concatenate_shard(
+            shard, shard_file, wav_info, config_dict, pronunciation_dict)
+        for entry in shard:
+            manifest[entry['id']] = shard_file.name
+    write_shard_manifest(manifest, shard_manifest_path(outputfile))
 
-    # Write the concatanated wav.
-    with closing(open(outwave, 'wb')) as output:
-        sio_wavfile.write(output, samplerate, frames)
 
-    # Weed out the skipped ones before writing the data out.
-    table = [token for token in table if not token['excluded']]
-    write_results(table, outcsv, config_dict['flags']['detect beep'])
-    if only_words:
-        generate_textgrid(table, out_textgrid, config_dict)
+def append_wavs(directory: Union[str, Path],
+                config_dict: dict,
+                pronunciation_dict: Union[dict, None] = None,
+                only_words: bool = False):
+    """
+    Append new recordings to an existing concatenation.
+
+    Recordings whose ids are not yet in the results csv are concatenated
+    onto the end of the existing wav, and their rows and intervals are added
+    to the results csv and the TextGrid. Nothing that is already in the
+    concatenation is read or rewritten, so annotations in the TextGrid are
+    kept as they are. If the concatenation was sharded, the recordings are
+    appended to the last shard.
+
+    If there is no concatenation yet, this is the same as concatenate_wavs.
+
+    Parameters
+    ----------
+    directory : Union[str, Path]
+        Path to the recordings.
+    config_dict : dict
+        Configuration.
+    pronunciation_dict : Union[dict, None], optional
+        Pronunciation dictionary, by default None
+    only_words : bool, optional
+        Ignore the pronunciation dictionary, by default False
+    """
+    outputfile = config_dict['outputfile']
+
+    if isinstance(directory, str):
+        directory = Path(directory)
+    if isinstance(outputfile, str):
+        outputfile = Path(outputfile)
+
+    manifest_file = shard_manifest_path(outputfile)
+    manifest = {}
+    target = outputfile
+    if manifest_file.is_file():
+        shards = read_shard_manifest(manifest_file)
+        for shard, token_ids in shards.items():
+            for token_id in token_ids:
+                manifest[token_id] = shard
+        target = outputfile.with_name(list(shards)[-1])
+
+    outwave = target.with_suffix(".wav")
+    outcsv = target.with_suffix(".csv")
+    out_textgrid = target.with_suffix(".TextGrid")
+
+    if not outwave.is_file() or not outcsv.is_file():
+        print(f"Did not find an existing concatenation at {target}. "
+              "Concatenating from scratch.")
+        concatenate_wavs(directory, config_dict, pronunciation_dict,
+                         only_words)
+        return
+
+    existing_ids = set(manifest)
+    if not manifest:
+        existing_ids = {row['id'] for row in read_results_csv(outcsv)}
+
+    table = get_token_list(config_dict, directory)
+    apply_exclusion_list(table, Path(config_dict['exclusion list']))
+    table = TokenTable(entry for entry in table
+                       if not entry['excluded'] and
+                       entry['id'] not in existing_ids)
+    if not table:
+        print(f"No new recordings to append to {target}.")
+        return
+    print(f"Appending {len(table)} recordings to {target}.")
+
+    detect_beep = config_dict['flags']['detect beep']
+
+    with closing(open(outcsv, 'r', encoding='utf8')) as csvfile:
+        has_beep_column = 'beep' in csvfile.readline()
+    if has_beep_column != detect_beep:
+        print(f"Beep detection setting does not match {outcsv}. Exiting.")
+        sys.exit()
+
+    # Check everything before touching the existing files.
+    wav_info = check_wav_formats(table)
+    existing = probe_wav(outwave)
+    if config_dict.get('output_sample_format') is not None:
+        new_format = config_dict['output_sample_format']
+    elif detect_beep:
+        # Beep detection decodes the samples, so they are written in the
+        # format scipy reads them as.
+        new_format = wav_info.dtype.name
     else:
-        generate_textgrid(table, out_textgrid, config_dict, pronunciation_dict)
-    # pp.pprint(table)
+        new_format = wav_info.sample_format
+    if (existing.samplerate != wav_info.samplerate or
+            existing.number_of_channels != wav_info.number_of_channels or
+            existing.sample_format != new_format):
+        print(f"New recordings ({wav_info.samplerate} Hz, "
+              f"{wav_info.number_of_channels} channel(s), {new_format}) "
+              f"do not match {outwave} ({existing.samplerate} Hz, "
+              f"{existing.number_of_channels} channel(s), "
+              f"{existing.sample_format}). Exiting.")
+        sys.exit()
+    new_size = existing.block_align * sum(
+        entry['wav_info'].frame_count for entry in table)
+    if not existing.rf64 and needs_rf64(existing.data_size + new_size):
+        print(f"Appending would take {outwave} over the 4 GiB limit of "
+              "RIFF wav files. Please concatenate from scratch. Exiting.")
+        sys.exit()
+
+    # Beep detection is run before anything is written, so that a recording
+    # it fails on does not leave the wav and the csv out of step.
+    cursor = existing.duration
+    add_timing_info_to_table(table, cursor)
+    if detect_beep:
+        detect_beeps_in_table(table, wav_info.samplerate, config_dict)
+
+    # If writing fails, the writer cuts the wav back to its old length.
+    with WavWriter.open_for_append(
+            existing, dither=config_dict['dither']) as writer:
+        splice_wavs_into(table, writer)
+        write_results(table, outcsv, detect_beep, append=True)
+
+    if out_textgrid.is_file():
+        textgrid = load_textgrid(out_textgrid)
+        append_tokens_to_textgrid(textgrid, table, config_dict)
+        save_textgrid(
+            textgrid, out_textgrid, config_dict.get('textgrid_format'))
+        print(f"Appended {len(table)} recordings to {out_textgrid}.")
+    else:
+        print(f"Did not find {out_textgrid}. Not appending to it.")
+
+    if manifest:
+        for entry in table:
+            manifest[entry['id']] = target.name
+        write_shard_manifest(manifest, manifest_file)
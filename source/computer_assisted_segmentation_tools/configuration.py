@@ -44,7 +44,8 @@ from pathlib import Path
 from typing import Union
 
 from strictyaml import (
-    Bool, Float, Map, Optional, ScalarValidator, Str, YAMLError, load)
+    Bool, Enum, Float, Int, Map, Optional, ScalarValidator, Seq, Str,
+    YAMLError, load)
 
 
 class PathValidator(ScalarValidator):
@@ -106,7 +107,22 @@ def read_config_file(filepath: Union[Path, str, None] = None) -> dict:
                 "word_guess": Map({
                     "begin": Float(),
                     "end": Float()
-                })
+                }),
+                Optional("jobs", default=1): Int(),
+                Optional("beep_search_window"): Float(),
+                Optional("max_shard_duration"): Float(),
+                Optional("max_shard_bytes"): Int(),
+                Optional("extract_tiers"): Seq(Str()),
+                Optional("extract_threads", default=1): Int(),
+                Optional("extract_overwrite", default="overwrite"): Enum(
+                    ["overwrite", "skip", "error"]),
+                Optional("textgrid_format"): Enum(
+                    ["long", "short", "binary"]),
+                Optional("clean_in_place", default=False): Bool(),
+                Optional("output_sample_format"): Enum(
+                    ["int16", "int24", "float32"]),
+                Optional("dither", default=False): Bool(),
+                Optional("token_id_pattern"): Str(),
             })
             try:
                 config_dict = load(yaml_file.read(), schema)
@@ -119,6 +135,12 @@ def read_config_file(filepath: Union[Path, str, None] = None) -> dict:
         sys.exit()
 
     data = config_dict.data
+    for name in ("jobs", "extract_threads"):
+        if data[name] < 1:
+            print(f"Fatal error in reading {filepath}:")
+            print(f"{name} should be at least 1, not {data[name]}.")
+            sys.exit()
+
     if "pronunciation_dictionary" in data and data["pronunciation_dictionary"]:
         if "[data_directory]" in data["pronunciation_dictionary"]:
             data["pronunciation_dictionary"].replace(
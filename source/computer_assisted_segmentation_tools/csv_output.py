@@ -31,6 +31,7 @@
 
 import csv
 from contextlib import closing
+from pathlib import Path
 
 
 def write_fav_input(table, filename):
@@ -49,12 +50,15 @@ def write_fav_input(table, filename):
     print("Wrote file " + filename + " for FAVE align.")
 
 
-def write_results(table, filename, detect_beep):
+def write_results(table, filename, detect_beep, append=False):
     """ 
     Write the metadata into a csv-formated file to be read by Python or R.
 
     This file is meant for the extraction script but also possibly
     used by later analysis stages.
+
+    If append is True, the rows are added to the end of an existing file
+    without writing the header again.
     """
     # extrasaction='ignore' does not seem to be working so we do this the long way
     if detect_beep:
@@ -63,12 +67,47 @@ def write_results(table, filename, detect_beep):
     else:
         fieldnames = ['id', 'speaker', 'sliceBegin',
                       'begin', 'sliceEnd', 'prompt']
-    results = [{key: entry[key] for key in fieldnames} for entry in table]
+    results = [{key: entry.get(key, 'n/a') for key in fieldnames}
+               for entry in table]
 
-    with closing(open(filename, 'w', encoding='utf8')) as csvfile:
+    mode = 'a' if append else 'w'
+    with closing(open(filename, mode, encoding='utf8')) as csvfile:
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames,
                                 quoting=csv.QUOTE_NONNUMERIC)
 
-        writer.writeheader()
+        if not append:
+            writer.writeheader()
         list(map(writer.writerow, results))
-    print(f"Wrote file {filename} for R/Python.")
+    if append:
+        print(f"Appended {len(results)} rows to {filename}.")
+    else:
+        print(f"Wrote file {filename} for R/Python.")
+
+
+def shard_manifest_path(outputfile: Path) -> Path:
+    """
+    Return the path of the shard manifest for a concatenation.
+
+    The manifest is written next to the shards as [outputfile]_shards.csv.
+    """
+    return outputfile.with_name(f"{outputfile.name}_shards.csv")
+
+
+def write_shard_manifest(manifest: dict[str, str], filename: Path) -> None:
+    """
+    Write the mapping of tokens to shards into a csv-formated file.
+
+    The file is read by extract to find the TextGrid each token is in.
+
+    Parameters
+    ----------
+    manifest : dict[str, str]
+        Shard names (output file names without suffix) keyed by token id.
+    filename : Path
+        Where to write the manifest.
+    """
+    with closing(open(filename, 'w', encoding='utf8')) as csvfile:
+        writer = csv.writer(csvfile, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(['id', 'shard'])
+        writer.writerows(manifest.items())
+    print(f"Wrote shard manifest {filename}.")
@@ -30,14 +30,30 @@
 #
 import csv
 import pprint
+import sys
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ThreadPoolExecutor, wait)
 from contextlib import closing
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Union
 
-from textgrids import TextGrid
+import numpy as np
+
+from .csv_output import shard_manifest_path
+from .textgrid_io import (
+    TextGridArrays, TierArrays, read_textgrid, write_textgrid_atomically)
 
 pp = pprint.PrettyPrinter(indent=4)
 
+# The standard tiers of a concatenated TextGrid are written under these names
+# in the extracted TextGrids. Other tiers keep their names.
+EXTRACTED_TIER_NAMES = {
+    "Utterance": "utterance",
+    "Word": "word",
+    "Segments": "segment",
+    "Phonetic detail": "Phonetic detail",
+}
+
 
 def read_results_csv(results_file: Path):
     """Read data written by CAST concatenate from a csv-formated file."""
@@ -49,66 +65,231 @@ def read_results_csv(results_file: Path):
     return table
 
 
-def extract_grids(table: List[Dict], long_grid: TextGrid, directory: Path):
+def split_tier(
+        tier: TierArrays,
+        slice_begins: np.ndarray,
+        slice_ends: np.ndarray
+) -> List[Union[slice, np.ndarray]]:
+    """
+    Split tier into the elements of each token.
+
+    An element belongs to a token if it lies completely between the token's
+    sliceBegin and sliceEnd.
+
+    Parameters
+    ----------
+    tier : TierArrays
+        Interval or point tier of the long TextGrid.
+    slice_begins : np.ndarray
+        sliceBegin of each token.
+    slice_ends : np.ndarray
+        sliceEnd of each token.
+
+    Returns
+    -------
+    List[Union[slice, np.ndarray]]
+        Index of the elements of each token in tier in the order of
+        slice_begins.
+    """
+    begins, ends = tier.begins, tier.ends
+    if np.any(np.diff(begins) < 0) or np.any(np.diff(ends) < 0):
+        # Times out of order can not be bisected, so fall back to checking
+        # every element for every token.
+        return [np.flatnonzero((begins >= slice_begin) & (ends <= slice_end))
+                for slice_begin, slice_end in zip(slice_begins, slice_ends)]
+
+    firsts = np.searchsorted(begins, slice_begins, side='left')
+    lasts = np.searchsorted(ends, slice_ends, side='right')
+    return [slice(first, max(first, last))
+            for first, last in zip(firsts.tolist(), lasts.tolist())]
+
+
+def extract_grids(
+        table: List[Dict],
+        long_grid: TextGridArrays,
+        directory: Path,
+        tier_names: Optional[List[str]] = None,
+        threads: int = 1,
+        overwrite: str = 'overwrite',
+        textgrid_format: Optional[str] = None
+) -> int:
     """
     Extract and write individual TextGrids.
     
     Uses the timing info in table to slice long_grid and offset the new
     TextGrids correctly. Saves resulting TextGrids in directory.
 
-    NOTE! Any existing TextGrids in outdirectory will be overwritten
-    without confirmation
+    All tiers of long_grid -- both interval and point tiers -- are extracted
+    unless tier_names is given. tier_names are the names of the tiers in
+    long_grid. The standard tiers are renamed in the extracted TextGrids as
+    given by EXTRACTED_TIER_NAMES. Every tier is split between the recordings
+    in one go before any TextGrids are written.
+
+    The TextGrids are written by a pool of threads, so that writing is not
+    held up by the latency of network file systems. Only a few TextGrids per
+    thread are kept waiting to be written at any given time.
+
+    Existing TextGrids in directory are handled according to overwrite:
+    'overwrite' replaces them, 'skip' leaves them as they are and writes
+    only the new ones, and 'error' exits without writing anything if any of
+    the TextGrids already exist.
+
+    The TextGrids are written in textgrid_format or by default in the format
+    of long_grid.
+
+    Returns
+    -------
+    int
+        Number of TextGrids written.
     """
-    # TODO: Get the Tier names from config or the textgrid itself.
-    utterances = long_grid.interval_tier_to_array("Utterance")
-    words = long_grid.interval_tier_to_array("Word")
-    segments = long_grid.interval_tier_to_array("Segments")
-    details = long_grid.interval_tier_to_array("Phonetic detail")
+    filenames = [(directory/entry['id']).with_suffix('.TextGrid')
+                 for entry in table]
+    if overwrite != 'overwrite':
+        existing = [filename for filename in filenames if filename.exists()]
+        if existing and overwrite == 'error':
+            print(f"Found {len(existing)} existing TextGrids in {directory} "
+                  f"including {existing[0].name}. Exiting.")
+            sys.exit()
+        elif existing:
+            print(f"Skipping {len(existing)} existing TextGrids in "
+                  f"{directory}.")
+            existing = set(existing)
+            table = [entry for entry, filename in zip(table, filenames)
+                     if filename not in existing]
+            filenames = [filename for filename in filenames
+                         if filename not in existing]
+
+    if tier_names is None:
+        tier_names = list(long_grid.tiers)
+    else:
+        missing = [name for name in tier_names if name not in long_grid.tiers]
+        for name in missing:
+            print(f"Did not find tier {name} in the TextGrid. Skipping it.")
+        tier_names = [name for name in tier_names if name not in missing]
+
+    slice_begins = np.array([entry["sliceBegin"] for entry in table],
+                            dtype=np.float64)
+    slice_ends = np.array([entry["sliceEnd"] for entry in table],
+                          dtype=np.float64)
+    split_tiers = {
+        name: split_tier(long_grid.tiers[name], slice_begins, slice_ends)
+        for name in tier_names}
 
+    if textgrid_format is None:
+        textgrid_format = long_grid.file_format
+
+    max_pending = 4 * threads
+    pending: set[Future] = set()
     i = 0
-    for entry in table:
-        utterance = []
-        word = []
-        segment = []
-        detail = []
-
-        for interval in utterances:
-            if interval['begin'] >= entry["sliceBegin"] and interval['end'] <= entry["sliceEnd"]:
-                utterance.append(interval)
- 
-        for interval in words:
-            if interval['begin'] >= entry["sliceBegin"] and interval['end'] <= entry["sliceEnd"]:
-                word.append(interval)
- 
-        for interval in segments:
-            if interval['begin'] >= entry["sliceBegin"] and interval['end'] <= entry["sliceEnd"]:
-                segment.append(interval)
-  
-        for interval in details:
-            if interval['begin'] >= entry["sliceBegin"] and interval['end'] <= entry["sliceEnd"]:
-                detail.append(interval)
-
-        textgrid = TextGrid(xmin = entry["sliceBegin"])
-        textgrid.interval_tier_from_array("utterance", utterance)
-        textgrid.interval_tier_from_array("word", word)
-        textgrid.interval_tier_from_array("segment", segment)
-        textgrid.interval_tier_from_array("Phonetic detail", detail)
-
-        textgrid.offset_time(-entry["sliceBegin"])
-
-        filename = (directory/entry['id']).with_suffix('.TextGrid')
-        # TODO: Check for existing TextGrids and add a mechanism for resolving
-        # overwrites via config and asking the user (and updating config
-        # accordingly at runtime).
-        textgrid.write(filename)
-        i += 1
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for j, entry in enumerate(table):
+            slice_begin = entry["sliceBegin"]
+
+            textgrid = TextGridArrays(
+                xmin=0.0, xmax=entry["sliceEnd"] - slice_begin,
+                file_format=textgrid_format)
+            for name in tier_names:
+                tier = long_grid.tiers[name].select(
+                    split_tiers[name][j], offset=-slice_begin,
+                    xmin=textgrid.xmin, xmax=textgrid.xmax)
+                tier.name = EXTRACTED_TIER_NAMES.get(name, name)
+                textgrid.add_tier(tier)
+
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for job in done:
+                    job.result()
+                    i += 1
+            pending.add(executor.submit(
+                write_textgrid_atomically, textgrid, filenames[j]))
+
+        for job in pending:
+            job.result()
+            i += 1
 
     return i
 
 
+def read_shard_manifest(manifest_file: Path) -> dict[str, list[str]]:
+    """
+    Read the token to shard mapping written by a sharded concatenate.
+
+    Returns
+    -------
+    dict[str, list[str]]
+        Token ids keyed by shard name in the order they appear in the file.
+    """
+    shards = {}
+    with closing(open(manifest_file, 'r', encoding='utf8')) as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            shards.setdefault(row['shard'], []).append(row['id'])
+
+    print("Read file " + str(manifest_file) + ".")
+    return shards
+
+
+def extract_concatenation(
+        outdirectory: Path,
+        results: Path,
+        token_ids: Optional[list[str]] = None,
+        tier_names: Optional[list[str]] = None,
+        threads: int = 1,
+        overwrite: str = 'overwrite',
+        textgrid_format: Optional[str] = None
+) -> int:
+    """
+    Extract the TextGrids of one concatenated wav.
+
+    Parameters
+    ----------
+    outdirectory : Path
+        Where to write the TextGrids.
+    results : Path
+        Path of the concatenation without suffix.
+    token_ids : Optional[list[str]], optional
+        Only extract these tokens, by default None for all tokens in the
+        results file.
+    tier_names : Optional[list[str]], optional
+        Only extract these tiers of the concatenated TextGrid, by default
+        None for all of its tiers.
+    threads : int, optional
+        Number of threads writing the TextGrids, by default 1
+    overwrite : str, optional
+        What to do with existing TextGrids, by default 'overwrite'. See
+        extract_grids.
+    textgrid_format : Optional[str], optional
+        Format of the TextGrids, by default None for the format of the
+        concatenated TextGrid.
+
+    Returns
+    -------
+    int
+        Number of TextGrids written.
+    """
+    results_csv = results.with_suffix('.csv')
+    grid_file = results.with_suffix('.TextGrid')
+
+    table = read_results_csv(results_csv)
+    if token_ids is not None:
+        token_ids = set(token_ids)
+        table = [entry for entry in table if entry['id'] in token_ids]
+
+    long_grid = read_textgrid(grid_file)
+    print(f"Read {grid_file}.")
+
+    return extract_grids(table, long_grid, outdirectory, tier_names,
+                         threads=threads, overwrite=overwrite,
+                         textgrid_format=textgrid_format)
+
+
 def extract_textgrids(
         outdirectory: Path, 
         results: Path,
+        tier_names: Optional[list[str]] = None,
+        threads: int = 1,
+        overwrite: str = 'overwrite',
+        textgrid_format: Optional[str] = None
     ):
     """
     Break a long TextGrid into recording specific ones.
@@ -116,19 +297,26 @@ def extract_textgrids(
     Reads the TextGrids specified by config (and produced by concatenate) and
     the results .csv file from the results argument. Writes individual TextGrids
     in outdirectory. 
-    
-    NOTE! Any existing TextGrids in outdirectory will be overwritten
-    without confirmation.
-    """
-
-    results_csv = results.with_suffix('.csv')
-    grid_file = results.with_suffix('.TextGrid')
-
-    table = read_results_csv(results_csv)
 
-    long_grid = TextGrid(grid_file)
-    print(f"Read {grid_file}.")
+    If concatenate split the recordings into shards, the shard manifest next
+    to results is used to find the shard each recording is in.
 
-    i = extract_grids(table, long_grid, outdirectory)
+    All tiers of the long TextGrids are extracted unless tier_names is given.
+    The TextGrids are written by a pool of threads threads and existing ones
+    are handled according to overwrite as described in extract_grids. They
+    are written in textgrid_format or if it is None in the format of the long
+    TextGrids.
+    """
+    manifest_file = shard_manifest_path(results)
+    if manifest_file.is_file():
+        i = 0
+        for shard, token_ids in read_shard_manifest(manifest_file).items():
+            i += extract_concatenation(
+                outdirectory, results.with_name(shard), token_ids, tier_names,
+                threads=threads, overwrite=overwrite,
+                textgrid_format=textgrid_format)
+    else:
+        i = extract_concatenation(
+            outdirectory, results, tier_names=tier_names, threads=threads,
+            overwrite=overwrite, textgrid_format=textgrid_format)
     print(f'Wrote {i} textgrids.')
-
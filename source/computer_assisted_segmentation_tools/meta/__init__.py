@@ -30,4 +30,5 @@
 #
 from .aaa_meta import check_and_load_aaa_meta
 from .csv_meta import check_and_load_csv_meta
+from .directory_index import DirectoryIndex
 from .rasl_meta import check_and_load_rasl_meta
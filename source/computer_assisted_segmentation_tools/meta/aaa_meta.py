@@ -28,34 +28,68 @@
 # articles listed in README.markdown. They can also be found in
 # citations.bib in BibTeX format.
 #
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import closing
 from pathlib import Path
 import sys
+from typing import Optional
 
+from ..token_table import Token, TokenTable
+from .directory_index import DirectoryIndex
 
-def add_prompt_info(table: list) -> None:
+# Prompt files are small, so reading them is all waiting on the file system.
+# On network file systems many reads in flight hide most of that latency.
+PROMPT_READER_THREADS = 16
+
+
+def read_prompt(prompt_path: Path) -> str:
+    """Read the prompt from the first line of an AAA prompt file."""
+    with closing(open(prompt_path, 'r', encoding='utf8')) as prompt_file:
+        return prompt_file.readline().strip()
+
+
+def add_prompt_info(
+        table: list, index: Optional[DirectoryIndex] = None,
+        threads: int = PROMPT_READER_THREADS) -> None:
     """
     Check for existence of prompts and add the prompt to table.
 
     If the prompt file does not exist, set the flag 'excluded' to True.
 
     Works in place, so does not return anything.
+
+    If index is given, the existence of the prompt files is checked from it
+    instead of on disk. The prompt files are read concurrently by a pool of
+    threads threads.
     """
+    with_prompt = []
     for entry in table:
-        if not entry['prompt_path'].is_file():
+        if index is not None:
+            has_prompt = index.is_file(entry['prompt_path'])
+        else:
+            has_prompt = entry['prompt_path'].is_file()
+        if not has_prompt:
             filename = entry['filename']
             print(f'Excluding {filename}. Recording has no prompt file.')
             entry['excluded'] = True
         else:
-            with closing(open(entry['prompt_path'], 'r',
-                              encoding='utf8')) as prompt_file:
-                prompt = prompt_file.readline().strip()
-                entry['prompt'] = prompt
+            with_prompt.append(entry)
+
+    prompt_paths = [entry['prompt_path'] for entry in with_prompt]
+    if threads > 1 and len(prompt_paths) > 1:
+        with ThreadPoolExecutor(
+                max_workers=min(threads, len(prompt_paths))) as executor:
+            prompts = list(executor.map(read_prompt, prompt_paths))
+    else:
+        prompts = [read_prompt(prompt_path) for prompt_path in prompt_paths]
+
+    for entry, prompt in zip(with_prompt, prompts):
+        entry['prompt'] = prompt
 
 
 def check_and_load_aaa_meta(
         speaker_id: str, directory: Path,
-        test: bool, require_ultrasound: bool = False, ) -> list[dict]:
+        test: bool, require_ultrasound: bool = False, ) -> TokenTable:
     """
     Check and load Trial metadata generated by AAA.
 
@@ -74,12 +108,14 @@ def check_and_load_aaa_meta(
 
     Returns
     -------
-    list[dict]
-        List of dicts containing the read and generated metadata.
+    TokenTable
+        Tokens containing the read and generated metadata.
     """
+    index = DirectoryIndex(directory)
+
     # Since we are concerned with audio annotation, wav files
     # determine the name list for all other files.
-    wav_files = sorted(directory.glob('*.wav'))
+    wav_files = index.paths('.wav')
     if len(wav_files) < 1:
         print(f"Didn't find any sound files to concatenate in {directory}.")
         sys.exit()
@@ -88,37 +124,30 @@ def check_and_load_aaa_meta(
     if test and len(wav_files) >= 10:
         wav_files = wav_files[:10]
 
-    prompt_files = sorted(directory.glob('*.txt'))
+    prompt_files = index.paths('.txt')
     if len(prompt_files) < 1:
         print(f"Didn't find any prompt files in {directory}.")
         sys.exit()
 
     # initialise table with the speaker_id and name repeated, wav_file name
-    # from the list, and other fields empty
-
-    # TODO: consider making this a dataclass
-    table = [{
-        'excluded': False,
-        'filename': wavfile.stem,
-        'wav_path': wavfile,
-        'prompt_path': wavfile.with_suffix('.txt'),
-        'ultra_path': wavfile.with_suffix('.ult'),
-        'id': wavfile.stem,
-        'speaker': speaker_id,
-        'sliceBegin': 'n/a',
-        'begin': 'n/a',
-        'end': 'n/a',
-        'prompt': 'n/a'}
-        for wavfile in wav_files]
+    # from the list, and other fields missing
+    table = TokenTable(Token(
+        filename=wavfile.stem,
+        wav_path=wavfile,
+        prompt_path=wavfile.with_suffix('.txt'),
+        ultra_path=wavfile.with_suffix('.ult'),
+        id=wavfile.stem,
+        speaker=speaker_id)
+        for wavfile in wav_files)
 
     if require_ultrasound:
         for entry in table:
             filename = entry['filename']
-            if not entry['ultra_path'].is_file():
+            if not index.is_file(entry['ultra_path']):
                 print(
                     f"Excluding {filename}. Recording has no ultrasound file.")
                 entry['excluded'] = True
 
-    add_prompt_info(table)
+    add_prompt_info(table, index)
 
     return table
@@ -33,6 +33,7 @@ from enum import Enum
 from pathlib import Path
 import sys
 
+from ..token_table import TokenTable
 from .aaa_meta import check_and_load_aaa_meta
 from .rasl_meta import check_and_load_rasl_meta
 
@@ -51,7 +52,7 @@ class Datasource(Enum):
     CSV = "csv"
 
 
-def get_token_list(config_dict: dict, directory: Path) -> dict:
+def get_token_list(config_dict: dict, directory: Path) -> TokenTable:
     speaker_id = config_dict['speaker id']
     test = config_dict['test']
 
@@ -59,7 +60,10 @@ def get_token_list(config_dict: dict, directory: Path) -> dict:
     if data_source is Datasource.AAA:
         table = check_and_load_aaa_meta(speaker_id, directory, test)
     elif data_source is Datasource.RASL:
-        table = check_and_load_rasl_meta(speaker_id, directory, test)
+        table = check_and_load_rasl_meta(
+            speaker_id, directory, test, config_dict.get('jobs', 1),
+            config_dict.get('output_sample_format'),
+            config_dict.get('dither', False))
     elif data_source is Datasource.CSV:
         # table = check_and_load_csv_meta(
         #     speaker_id, directory, test, csv_meta_file)
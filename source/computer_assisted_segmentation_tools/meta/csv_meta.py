@@ -29,34 +29,206 @@
 # citations.bib in BibTeX format.
 #
 from contextlib import closing
-from csv import DictReader
+import csv
 from pathlib import Path
+import re
 import sys
+from typing import BinaryIO, Callable, Iterator, Optional
 
+from ..token_table import Token, TokenTable
+from .directory_index import DirectoryIndex
+from .sidecar_cache import read_sidecar_cache, write_sidecar_cache
 
-def add_prompt_info(table: list[dict], csv_meta_file: Path):
+# The index of a metadata csv file is kept in a hidden file next to it.
+CSV_INDEX_SUFFIX = ".cast_index.json"
+CSV_INDEX_VERSION = 1
+
+
+def legacy_token_id(stem: str) -> str:
+    """Token id from a file name as CAST has always done it."""
+    return stem[6:10].replace('_', '.')
+
+
+def token_id_extractor(
+        token_id_pattern: Optional[str] = None
+) -> Callable[[str], Optional[str]]:
     """
-    Read AAA prompt file and add metadata from it to the table.
+    Make a function for finding the token id in a file name.
+
+    Parameters
+    ----------
+    token_id_pattern : Optional[str], optional
+        Regular expression searched for in the file name without suffix. The
+        token id is the first group of the match or the whole match if the
+        pattern has no groups. By default None for legacy_token_id.
+
+    Returns
+    -------
+    Callable[[str], Optional[str]]
+        Function from file name stem to token id or None if there is no
+        match.
+    """
+    if token_id_pattern is None:
+        return legacy_token_id
+
+    pattern = re.compile(token_id_pattern)
+    group = 1 if pattern.groups else 0
+
+    def extract(stem: str) -> Optional[str]:
+        match = pattern.search(stem)
+        if match is None:
+            return None
+        return match.group(group)
+
+    return extract
+
+
+def _decoded_lines(meta_file: BinaryIO,
+                   line_offsets: Optional[list[int]] = None) -> Iterator[str]:
+    """
+    Decode lines of meta_file, optionally noting where each one begins.
+
+    csv.reader pulls lines from this only as far as it needs, so the offsets
+    tell where each record begins even if quoted fields span several lines.
+    """
+    offset = meta_file.tell()
+    # Skip a byte order mark at the beginning of the file.
+    encoding = 'utf-8-sig' if offset == 0 else 'utf8'
+    for line in meta_file:
+        if line_offsets is not None:
+            line_offsets.append(offset)
+        offset += len(line)
+        yield line.decode(encoding)
+        encoding = 'utf8'
+
+
+def build_csv_index(csv_meta_file: Path) -> tuple[list[str], dict[str, int]]:
+    """
+    Index the rows of a metadata csv file by their id.
 
     Parameters
     ----------
-    table : dict
-        _description_
     csv_meta_file : Path
-        _description_
+        The csv file. It should have an 'id' column.
+
+    Returns
+    -------
+    tuple[list[str], dict[str, int]]
+        The header and the byte offset of each row keyed by id. If an id
+        appears more than once, the last row wins.
+    """
+    offsets = {}
+    line_offsets = []
+    with closing(open(csv_meta_file, 'rb')) as meta_file:
+        reader = csv.reader(_decoded_lines(meta_file, line_offsets))
+        header = next(reader)
+        id_column = header.index('id')
+        while True:
+            first_line = len(line_offsets)
+            try:
+                row = next(reader)
+            except StopIteration:
+                break
+            if len(row) > id_column:
+                offsets[row[id_column]] = line_offsets[first_line]
+    return header, offsets
+
+
+def read_csv_index(csv_meta_file: Path) -> tuple[list[str], dict[str, int]]:
+    """
+    Read the index of a metadata csv file building it if needed.
+
+    The index is stored in a sidecar file next to csv_meta_file together
+    with the path, modification time and size of the csv file, and is built
+    again only when those change.
+
+    Parameters
+    ----------
+    csv_meta_file : Path
+        The csv file.
+
+    Returns
+    -------
+    tuple[list[str], dict[str, int]]
+        The header and the byte offset of each row keyed by id.
     """
-    meta_dict = {}
-    with closing(open(csv_meta_file, 'r', encoding='utf8')) as meta_file:
-        reader = DictReader(meta_file)
-        for row in reader:
-            meta_dict[row['id']] = row['ortho']
+    key, index = read_sidecar_cache(
+        csv_meta_file, CSV_INDEX_SUFFIX, CSV_INDEX_VERSION)
+    if index is not None:
+        return index['header'], index['offsets']
+
+    print(f"Indexing {csv_meta_file}.")
+    header, offsets = build_csv_index(csv_meta_file)
+    write_sidecar_cache(
+        csv_meta_file, CSV_INDEX_SUFFIX, key,
+        {'header': header, 'offsets': offsets})
+    return header, offsets
+
+
+def read_csv_rows(csv_meta_file: Path,
+                  token_ids: list[str]) -> dict[str, dict[str, str]]:
+    """
+    Read only the rows of the given tokens from a metadata csv file.
+
+    Parameters
+    ----------
+    csv_meta_file : Path
+        The csv file.
+    token_ids : list[str]
+        Ids of the rows to read.
+
+    Returns
+    -------
+    dict[str, dict[str, str]]
+        Rows keyed by id. Ids that are not in the file are left out.
+    """
+    header, offsets = read_csv_index(csv_meta_file)
+    wanted = sorted({offsets[token_id]
+                     for token_id in token_ids if token_id in offsets})
+
+    rows = {}
+    with closing(open(csv_meta_file, 'rb')) as meta_file:
+        for offset in wanted:
+            meta_file.seek(offset)
+            values = next(csv.reader(_decoded_lines(meta_file)))
+            row = dict(zip(header, values))
+            rows[row['id']] = row
+    return rows
+
+
+def add_prompt_info(table: TokenTable, csv_meta_file: Path):
+    """
+    Read the prompts of the tokens from a metadata csv file.
+
+    The prompt of each token is in the 'ortho' column of the row whose 'id'
+    is the token's token_id. Only the rows of the tokens in table are read,
+    see read_csv_rows. Tokens that have no row are excluded.
+
+    Parameters
+    ----------
+    table : TokenTable
+        The tokens.
+    csv_meta_file : Path
+        The metadata csv file.
+    """
+    rows = read_csv_rows(
+        csv_meta_file, [item['token_id'] for item in table
+                        if item['token_id'] is not None])
 
     for item in table:
-        item['prompt'] = meta_dict[item['token_id']]
+        row = rows.get(item['token_id'])
+        if row is None:
+            filename = item['filename']
+            print(f'Excluding {filename}. Recording has no row in '
+                  f'{csv_meta_file}.')
+            item['excluded'] = True
+        else:
+            item['prompt'] = row['ortho']
 
 
-def check_and_load_csv_meta(speaker_id: str, directory: Path,
-                            test: bool, csv_meta_file: Path) -> list[dict]:
+def check_and_load_csv_meta(
+        speaker_id: str, directory: Path, test: bool, csv_meta_file: Path,
+        token_id_pattern: Optional[str] = None) -> TokenTable:
     """
     Currently not supported.
 
@@ -73,15 +245,20 @@ def check_and_load_csv_meta(speaker_id: str, directory: Path,
         _description_
     csv_meta_file : Path
         _description_
+    token_id_pattern : Optional[str], optional
+        Regular expression for finding the token id in file names, by default
+        None. See token_id_extractor.
 
     Returns
     -------
-    list[dict]
+    TokenTable
         _description_
     """
+    index = DirectoryIndex(directory)
+
     # Since we are concerned with audio annotation, wav files
     # determine the name list for all other files.
-    wav_files = sorted(directory.glob('*.wav'))
+    wav_files = index.paths('.wav')
     if len(wav_files) < 1:
         print(f"Didn't find any sound files to concatenate in {directory}.")
         sys.exit()
@@ -90,27 +267,21 @@ def check_and_load_csv_meta(speaker_id: str, directory: Path,
     if test and len(wav_files) >= 10:
         wav_files = wav_files[:10]
 
-    prompt_files = sorted(directory.glob('*.txt'))
+    prompt_files = index.paths('.txt')
     if len(prompt_files) < 1:
         print(f"Didn't find any prompt files in {directory}.")
         sys.exit()
 
     # initialise table with the speaker_id and name repeated, wav_file name
-    # from the list, and other fields empty
-    table = [{
-        'excluded': False,
-        'filename': wavfile.stem,
-        'wav_path': wavfile,
-        'token_id': wavfile.stem[6:10].replace('_', '.'),
-        'prompt_path': None,
-        'ultra_path': None,
-        'id':wavfile.stem,
-        'speaker':speaker_id,
-        'sliceBegin':'n/a',
-        'begin':'n/a',
-                'end':'n/a',
-                'prompt':'n/a'}
-             for wavfile in wav_files]
+    # from the list, and other fields missing
+    token_id = token_id_extractor(token_id_pattern)
+    table = TokenTable(Token(
+        filename=wavfile.stem,
+        wav_path=wavfile,
+        token_id=token_id(wavfile.stem),
+        id=wavfile.stem,
+        speaker=speaker_id)
+        for wavfile in wav_files)
 
     add_prompt_info(table, csv_meta_file)
 
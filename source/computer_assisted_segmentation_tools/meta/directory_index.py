@@ -0,0 +1,119 @@
+#
+# Copyright (c) 2022-2024 Pertti Palo.
+#
+# This file is part of Computer Assisted Segmentation Tools
+# (see https://github.com/giuthas-speech-research-tools/cast/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# The example data packaged with this program is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License. You should have received a
+# copy of the Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License along with the data. If not,
+# see <https://creativecommons.org/licenses/by-nc-sa/4.0/> for details.
+#
+# When using the toolkit for scientific publications, please cite the
+# articles listed in README.markdown. They can also be found in
+# citations.bib in BibTeX format.
+#
+"""
+One pass listing of a directory for the meta loaders.
+"""
+
+import os
+from pathlib import Path
+from typing import Optional, Union
+
+
+class DirectoryIndex:
+    """
+    Files and subdirectories of a directory listed with a single scan.
+
+    The directory is read once with os.scandir and the files are grouped by
+    stem and suffix, so questions like 'is there a prompt file for this
+    recording' are answered from memory instead of with a stat call per file.
+    This matters on network file systems where every call is a round trip.
+
+    Hidden files, like the ._ files macOS leaves on network shares, are left
+    out.
+
+    Attributes
+    ----------
+    directory : Path
+        The indexed directory.
+    files : dict[str, dict[str, Path]]
+        Paths of the files keyed by stem and suffix.
+    directories : set[str]
+        Names of the subdirectories.
+    """
+
+    def __init__(self, directory: Union[Path, str]) -> None:
+        self.directory = Path(directory)
+        self.files: dict[str, dict[str, Path]] = {}
+        self.directories: set[str] = set()
+
+        if not self.directory.is_dir():
+            return
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir():
+                    self.directories.add(entry.name)
+                elif entry.is_file():
+                    path = self.directory / entry.name
+                    self.files.setdefault(path.stem, {})[path.suffix] = path
+
+    def paths(self, suffix: str, prefix: str = '') -> list[Path]:
+        """
+        Sorted paths of the files with the given suffix.
+
+        Parameters
+        ----------
+        suffix : str
+            Suffix including the dot like '.wav'.
+        prefix : str, optional
+            Only list files whose names begin with prefix, by default ''
+
+        Returns
+        -------
+        list[Path]
+            The paths sorted as Path.glob results usually are.
+        """
+        return sorted(
+            suffixes[suffix] for stem, suffixes in self.files.items()
+            if suffix in suffixes and stem.startswith(prefix))
+
+    def path(self, stem: str, suffix: str) -> Optional[Path]:
+        """Path of the file stem + suffix or None if there is no such file."""
+        return self.files.get(stem, {}).get(suffix)
+
+    def has_file(self, stem: str, suffix: str) -> bool:
+        """Is there a file called stem + suffix in the directory."""
+        return suffix in self.files.get(stem, {})
+
+    def is_file(self, path: Path) -> bool:
+        """
+        Is path a file in the directory.
+
+        Paths outside of the directory are checked on disk.
+        """
+        if path.parent != self.directory:
+            return path.is_file()
+        return self.has_file(path.stem, path.suffix)
+
+    def has_directory(self, name: str) -> bool:
+        """Is there a subdirectory called name in the directory."""
+        return name in self.directories
@@ -28,61 +28,227 @@
 # articles listed in README.markdown. They can also be found in
 # citations.bib in BibTeX format.
 #
+import csv
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
 from datetime import datetime
 from pathlib import Path, PureWindowsPath
+from typing import Optional
 
 import scipy.io
 
 from ..rasl_dat_to_wav import dat_to_wav
+from ..token_table import Token, TokenTable
+from .directory_index import DirectoryIndex
+from .sidecar_cache import read_sidecar_cache, write_sidecar_cache
 
+# Written in the WAV directory to record which wavs were converted from which
+# version of their DAT.
+CONVERSION_MANIFEST_NAME = "dat_to_wav.csv"
+CONVERSION_MANIFEST_FIELDS = [
+    'dat_filename', 'dat_mtime_ns', 'dat_size',
+    'wav_filename', 'wav_mtime_ns', 'wav_size', 'sample_format', 'status']
 
-def convert_dats_to_wav(table: dict) -> None:
+# Parsed official notes are cached in a hidden file next to the .mat file.
+NOTES_CACHE_SUFFIX = ".cast_cache.json"
+NOTES_CACHE_VERSION = 1
+
+
+def read_conversion_manifest(manifest_file: Path) -> dict[str, dict]:
+    """
+    Read the DAT to WAV conversion manifest.
+
+    Returns
+    -------
+    dict[str, dict]
+        Manifest rows keyed by DAT filename. Empty if there is no manifest.
+    """
+    if not manifest_file.is_file():
+        return {}
+    with closing(open(manifest_file, 'r', encoding='utf8')) as csvfile:
+        reader = csv.DictReader(csvfile)
+        return {row['dat_filename']: row for row in reader}
+
+
+def write_conversion_manifest(
+        manifest: dict[str, dict], manifest_file: Path) -> None:
+    """Write the DAT to WAV conversion manifest through a temporary file."""
+    temp_file = manifest_file.with_name(manifest_file.name + ".tmp")
+    with closing(open(temp_file, 'w', encoding='utf8', newline='')) as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=CONVERSION_MANIFEST_FIELDS)
+        writer.writeheader()
+        for row in manifest.values():
+            writer.writerow(row)
+    os.replace(temp_file, manifest_file)
+
+
+def wav_is_current(
+        dat_stat: os.stat_result, wav_path: Path,
+        manifest_row: Optional[dict], sample_format: str = '') -> bool:
     """
-    _summary_
+    Check if the wav converted from a DAT is up to date.
+
+    If the conversion manifest has a row for the DAT, the wav is current if
+    both the DAT and the wav have the modification time and size recorded
+    there and the wav is in sample_format. Otherwise the wav is current if it
+    is not empty and is newer than the DAT.
 
     Parameters
     ----------
-    table : dict
-        _description_
+    dat_stat : os.stat_result
+        Stat of the DAT file.
+    wav_path : Path
+        The wav the DAT is converted to.
+    manifest_row : Optional[dict]
+        The DAT's row in the conversion manifest or None.
+    sample_format : str, optional
+        Sample format the wav should be in, by default '' for the default
+        format of dat_to_wav.
+
+    Returns
+    -------
+    bool
+        True if the DAT does not need to be converted.
     """
-    print("Looking for DAT files and trying to convert them to WAV.")
-    for entry in table:
-        if entry['dat_path'].is_file():
-            dat_to_wav(entry['dat_path'], entry['wav_path'])
-        else:
-            print(f"Dat file {entry['dat_path']} does not exist. Skipping.")
-            continue
+    try:
+        wav_stat = wav_path.stat()
+    except FileNotFoundError:
+        return False
 
+    if manifest_row is not None and manifest_row['status'] == 'converted':
+        return (manifest_row.get('sample_format', '') == sample_format and
+                int(manifest_row['dat_mtime_ns']) == dat_stat.st_mtime_ns and
+                int(manifest_row['dat_size']) == dat_stat.st_size and
+                int(manifest_row['wav_mtime_ns']) == wav_stat.st_mtime_ns and
+                int(manifest_row['wav_size']) == wav_stat.st_size)
+    return (wav_stat.st_size > 0 and
+            wav_stat.st_mtime_ns >= dat_stat.st_mtime_ns)
 
-def check_and_load_rasl_meta(speaker_id: str, directory: Path,
-                             test: bool) -> list[dict]:
+
+def convert_dat(dat_path: Path, wav_path: Path,
+                sample_format: Optional[str] = None,
+                dither: bool = False) -> dict:
     """
-    Read a RASL .mat file and return relevant contents as a dict.
+    Convert a DAT file into a wav and describe the result.
+
+    This is the unit of work of convert_dats_to_wav and is run in worker
+    processes.
+
+    Returns
+    -------
+    dict
+        A row of the conversion manifest.
     """
-    wav_dir = directory / "WAV"
+    dat_stat = dat_path.stat()
+    row = {
+        'dat_filename': dat_path.name,
+        'dat_mtime_ns': dat_stat.st_mtime_ns,
+        'dat_size': dat_stat.st_size,
+        'wav_filename': wav_path.name,
+        'wav_mtime_ns': '',
+        'wav_size': '',
+        'sample_format': sample_format or '',
+    }
+    try:
+        dat_to_wav(dat_path, wav_path, sample_format, dither)
+    except ValueError as error:
+        print(f"Could not convert {dat_path}: {error}")
+        row['status'] = 'failed'
+        return row
 
-    note_dir = directory / "NOTES"
-    if not note_dir.is_dir():
-        note_dir = directory / "Notes"
-    if not note_dir.is_dir():
-        note_dir = directory / "notes"
-    if not note_dir.is_dir():
-        print(f"Notes dir {note_dir} does not exist. Exiting.")
-        sys.exit()
+    wav_stat = wav_path.stat()
+    row['wav_mtime_ns'] = wav_stat.st_mtime_ns
+    row['wav_size'] = wav_stat.st_size
+    row['status'] = 'converted'
+    return row
 
-    possible_notes = sorted(note_dir.glob('officialNotes*.mat'))
-    if not possible_notes:
-        print(f"Found no notes in {note_dir}. Exiting.")
-        sys.exit()
-    mat_file = possible_notes[0]
 
+def convert_dats_to_wav(
+        table: TokenTable, wav_dir: Path, jobs: int = 1,
+        sample_format: Optional[str] = None, dither: bool = False) -> None:
+    """
+    Convert the DAT files of the table to wav if they are not up to date.
+
+    Only DATs whose wav is missing or older than the DAT, or whose DAT or wav
+    no longer match the conversion manifest in wav_dir, are converted. The
+    conversions are run in a pool of jobs worker processes and the results
+    are recorded in the manifest.
+
+    Parameters
+    ----------
+    table : TokenTable
+        Meta data of the recordings including 'dat_path' and 'wav_path'.
+    wav_dir : Path
+        Directory the wavs are written in.
+    jobs : int, optional
+        Number of worker processes, by default 1
+    sample_format : Optional[str], optional
+        Sample format of the wavs, by default None. See dat_to_wav.
+    dither : bool, optional
+        Add TPDF dither when converting to integers, by default False.
+    """
+    if not wav_dir.is_dir():
+        wav_dir.mkdir()
+    manifest_file = wav_dir/CONVERSION_MANIFEST_NAME
+    manifest = read_conversion_manifest(manifest_file)
+
+    stale = []
+    for entry in table:
+        dat_path = entry['dat_path']
+        try:
+            dat_stat = dat_path.stat()
+        except FileNotFoundError:
+            print(f"Dat file {dat_path} does not exist. Skipping.")
+            continue
+        if not wav_is_current(
+                dat_stat, entry['wav_path'], manifest.get(dat_path.name),
+                sample_format or ''):
+            stale.append(entry)
+
+    if not stale:
+        return
+
+    print(f"Converting {len(stale)} DAT files to WAV.")
+    dat_paths = [entry['dat_path'] for entry in stale]
+    wav_paths = [entry['wav_path'] for entry in stale]
+    sample_formats = [sample_format] * len(stale)
+    dithers = [dither] * len(stale)
+    if jobs > 1 and len(stale) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            rows = list(executor.map(
+                convert_dat, dat_paths, wav_paths, sample_formats, dithers))
+    else:
+        rows = [convert_dat(*arguments) for arguments in zip(
+            dat_paths, wav_paths, sample_formats, dithers)]
+
+    for row in rows:
+        manifest[row['dat_filename']] = row
+    write_conversion_manifest(manifest, manifest_file)
+
+
+def parse_official_notes(mat_file: Path) -> list[dict]:
+    """
+    Read the recordings listed in a RASL officialNotes .mat file.
+
+    Parameters
+    ----------
+    mat_file : Path
+        The .mat file.
+
+    Returns
+    -------
+    list[dict]
+        For each recording 'trial_number', 'prompt', 'dat_name' -- the name
+        of the DAT file without directories -- and 'date_and_time'.
+    """
     mat = scipy.io.loadmat(str(mat_file), squeeze_me=True)
     if not mat:
         print(f"Official notes at {mat_file} seems to be empty. Exiting.")
         sys.exit()
 
-    table = []
+    notes = []
     for element in mat['officialNotes']:
         # Apparently squeeze_me=True is a bit too strident and
         # somehow looses the shape of the most interesting level
@@ -102,35 +268,103 @@ def check_and_load_rasl_meta(speaker_id: str, directory: Path,
                 date_and_time = datetime.strptime(
                     element[5], "%d-%b-%Y %H:%M:%S")
 
-            dat_name = dat_name.name
-            dat_path = directory/"DAT"/dat_name
-            dat_path = dat_path.with_suffix('.dat')
-
-            wav_path = (wav_dir/dat_path.stem).with_suffix('.wav')
-
-            meta_token = {
-                'excluded': False,
-                'trial_number': element[0],
-                'filename': dat_path.stem,
-                'dat_filename': dat_path.name,
-                'dat_path': dat_path,
-                'wav_path': wav_path,
-                'id': dat_path.stem,
-                'speaker': speaker_id,
-                'sliceBegin': 'n/a',
-                'begin': 'n/a',
-                'end': 'n/a',
+            trial_number = element[0]
+            if hasattr(trial_number, 'item'):
+                trial_number = trial_number.item()
+            notes.append({
+                'trial_number': trial_number,
+                'prompt': str(element[1]),
+                'dat_name': dat_name.name,
                 'date_and_time': date_and_time,
-                'prompt': element[1]
-            }
-            table.append(meta_token)
-
-    wav_files = sorted(wav_dir.glob('*.wav'))
-    if (len(wav_files) < 1):
-        print(f"Didn't find any sound files to concatanate in {directory}.")
-        if not wav_dir.is_dir():
-            wav_dir.mkdir()
-        convert_dats_to_wav(table)
+            })
+    return notes
+
+
+def read_official_notes(mat_file: Path) -> list[dict]:
+    """
+    Read a RASL officialNotes .mat file through a cache.
+
+    The parsed notes are cached in a sidecar file next to mat_file together
+    with the path, modification time and size of mat_file. As long as those
+    have not changed, the notes are read from the cache and the .mat file is
+    not loaded at all.
+
+    Parameters
+    ----------
+    mat_file : Path
+        The .mat file.
+
+    Returns
+    -------
+    list[dict]
+        The notes as returned by parse_official_notes.
+    """
+    key, cached_notes = read_sidecar_cache(
+        mat_file, NOTES_CACHE_SUFFIX, NOTES_CACHE_VERSION)
+    if cached_notes is not None:
+        for note in cached_notes:
+            note['date_and_time'] = datetime.fromisoformat(
+                note['date_and_time'])
+        return cached_notes
+
+    notes = parse_official_notes(mat_file)
+    write_sidecar_cache(
+        mat_file, NOTES_CACHE_SUFFIX, key,
+        [{**note, 'date_and_time': note['date_and_time'].isoformat()}
+         for note in notes])
+    return notes
+
+
+def check_and_load_rasl_meta(speaker_id: str, directory: Path,
+                             test: bool, jobs: int = 1,
+                             sample_format: Optional[str] = None,
+                             dither: bool = False) -> TokenTable:
+    """
+    Read a RASL .mat file and return relevant contents as a dict.
+
+    The parsed notes are cached next to the .mat file, see
+    read_official_notes. DAT files whose wav is missing or out of date are
+    converted to wav in sample_format with jobs worker processes.
+    """
+    wav_dir = directory / "WAV"
+
+    index = DirectoryIndex(directory)
+    for name in ("NOTES", "Notes", "notes"):
+        note_dir = directory / name
+        if index.has_directory(name):
+            break
+    else:
+        print(f"Notes dir {note_dir} does not exist. Exiting.")
+        sys.exit()
+
+    possible_notes = DirectoryIndex(note_dir).paths(
+        '.mat', prefix='officialNotes')
+    if not possible_notes:
+        print(f"Found no notes in {note_dir}. Exiting.")
+        sys.exit()
+    mat_file = possible_notes[0]
+
+    table = TokenTable()
+    for note in read_official_notes(mat_file):
+        dat_path = directory/"DAT"/note['dat_name']
+        dat_path = dat_path.with_suffix('.dat')
+
+        wav_path = (wav_dir/dat_path.stem).with_suffix('.wav')
+
+        meta_token = Token(
+            trial_number=note['trial_number'],
+            filename=dat_path.stem,
+            dat_filename=dat_path.name,
+            dat_path=dat_path,
+            wav_path=wav_path,
+            id=dat_path.stem,
+            speaker=speaker_id,
+            date_and_time=note['date_and_time'],
+            prompt=note['prompt']
+        )
+        table.append(meta_token)
+
+    convert_dats_to_wav(table, wav_dir, jobs, sample_format, dither)
 
     # for test runs do only first ten files:
     if test and len(table) >= 10:
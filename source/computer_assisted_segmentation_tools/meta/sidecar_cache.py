@@ -0,0 +1,128 @@
+#
+# Copyright (c) 2022-2024 Pertti Palo.
+#
+# This file is part of Computer Assisted Segmentation Tools
+# (see https://github.com/giuthas-speech-research-tools/cast/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# The example data packaged with this program is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License. You should have received a
+# copy of the Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License along with the data. If not,
+# see <https://creativecommons.org/licenses/by-nc-sa/4.0/> for details.
+#
+# When using the toolkit for scientific publications, please cite the
+# articles listed in README.markdown. They can also be found in
+# citations.bib in BibTeX format.
+#
+"""
+Caches of parsed files kept in hidden sidecar files next to them.
+"""
+
+from contextlib import closing
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import Optional, Union
+
+from ..path_functions import new_file_mode
+
+
+def sidecar_path(source_file: Path, suffix: str) -> Path:
+    """Path of the hidden sidecar file of source_file."""
+    return source_file.with_name(f".{source_file.name}{suffix}")
+
+
+def read_sidecar_cache(
+        source_file: Path, suffix: str, version: int
+) -> tuple[dict, Optional[dict]]:
+    """
+    Read the cache of source_file if it is still current.
+
+    The cache is current if it was written with the same version from a
+    file with the same path, modification time and size as source_file.
+
+    Parameters
+    ----------
+    source_file : Path
+        The cached file.
+    suffix : str
+        Suffix of the sidecar file.
+    version : int
+        Version of the format of the cached data.
+
+    Returns
+    -------
+    tuple[dict, Optional[dict]]
+        The key of the current version of source_file for passing to
+        write_sidecar_cache, and the cached data or None if there is no
+        current cache.
+    """
+    stat = source_file.stat()
+    key = {
+        'version': version,
+        'path': str(source_file.resolve()),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+    }
+    cache_file = sidecar_path(source_file, suffix)
+    try:
+        with closing(open(cache_file, 'r', encoding='utf8')) as json_file:
+            cache = json.load(json_file)
+    except (OSError, ValueError):
+        return key, None
+    if not isinstance(cache, dict) or cache.get('key') != key:
+        return key, None
+    return key, cache['data']
+
+
+def write_sidecar_cache(
+        source_file: Path, suffix: str, key: dict, data: Union[dict, list]
+) -> None:
+    """
+    Write the cache of source_file.
+
+    The cache is written to a uniquely named temporary file and renamed
+    over the sidecar file, so runs caching the same file at the same time
+    never see a half written cache. Failing to write the cache is reported
+    but is not an error, since the directory may well be read-only.
+
+    Parameters
+    ----------
+    source_file : Path
+        The cached file.
+    suffix : str
+        Suffix of the sidecar file.
+    key : dict
+        Key returned by read_sidecar_cache.
+    data : Union[dict, list]
+        The data to cache. Must be serialisable as JSON.
+    """
+    cache_file = sidecar_path(source_file, suffix)
+    temp_name = None
+    try:
+        handle, temp_name = tempfile.mkstemp(
+            dir=cache_file.parent, prefix=f"{cache_file.name}.",
+            suffix=".tmp")
+        with closing(os.fdopen(handle, 'w', encoding='utf8')) as json_file:
+            json.dump({'key': key, 'data': data}, json_file)
+        os.chmod(temp_name, new_file_mode(cache_file))
+        os.replace(temp_name, cache_file)
+    except OSError as error:
+        print(f"Could not write the cache {cache_file}: {error}")
+        if temp_name is not None and os.path.exists(temp_name):
+            os.remove(temp_name)
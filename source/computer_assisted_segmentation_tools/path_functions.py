@@ -28,11 +28,48 @@
 # articles listed in README.markdown. They can also be found in
 # citations.bib in BibTeX format.
 #
+import os
 from pathlib import Path
+import stat
 import sys
 
 from icecream import ic
 
 
+def _read_umask() -> int:
+    """Read the process umask by setting it and putting it back."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Setting the umask is not thread safe, so it is read once at import.
+UMASK = _read_umask()
+
+
+def new_file_mode(path: Path) -> int:
+    """
+    Permission bits for a file about to be written over path.
+
+    Temporary files are created readable only by their owner. Giving them
+    these permissions before they are renamed over path keeps the mode of an
+    existing file and gives a new file the mode open() would have given it.
+
+    Parameters
+    ----------
+    path : Path
+        The file that will be replaced or created.
+
+    Returns
+    -------
+    int
+        The mode of path if it exists, otherwise 0o666 masked by the umask.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~UMASK
+
+
 def initialise_dataset(path: Path, config_dict: dict) -> None:
     ic(config_dict)
@@ -29,61 +29,136 @@
 # citations.bib in BibTeX format.
 #
 
-from contextlib import closing
 from pathlib import Path
+from typing import Optional
 
 import matplotlib.pyplot as plt
 import numpy as np
-import scipy.io.wavfile as sio_wavfile
-
-
-def dat_to_wav(datpath: Path, wavpath: Path):
-    with closing(open(datpath, 'rb')) as dat_file:
-        # Matlab version does a test here to decide if the
-        # recording is from Labview or RASL 1.0.
-        # We don't. We just blindly assume RASL 1.0
-        raw_data = dat_file.read()
-        data = np.frombuffer(raw_data, dtype='float')
-        diffData = data[1:]-data[0]
-        threshold = 0.0001
-        numberOfChannels = np.median(
-            np.diff(np.nonzero(np.abs(diffData) < threshold)))
-        numberOfChannels = int(numberOfChannels)
-        if len(data) % numberOfChannels == 0:
-            data.shape = [int(len(data)/numberOfChannels), 
-                            numberOfChannels]
-
-        # The commented out section below tries to replicate the batchDAT2WAV 
-        # behaviour but something makes difference 1D when it should be 2D.
-        # Since we are for the moment dealing with a steady data source, 
-        # we just hardcode the variables instead.
-
-        # print(data.shape)
-        # print(data[:8,:])
-        
-        # difference = np.diff(np.flipud(data[:,0]))
-
-        # print(np.flipud(data[:,3]).shape)
-        # plt.plot(data[:,3])
-        # plt.show()
-
-        # idx = np.nonzero(difference >= 2)#[0]
-        # idx = len(data[:,3]) - idx + 1
-        # data = data[:idx, :]
-
-        # # Define the DAT variables
-        # temp = np.diff(np.nonzero(data[:,0]>=1))/np.diff(data(np.nonzero(data[:,0]>=1)))
-        # sampling_rate = np.round(np.median(temp))
-        # if sampling_rate != 48000:
-        #     print(f'Calculated sampling rate {sampling_rate} is not equal to 48kHz.')
-        #     sampling_rate = 48000
-        # data = data/np.repmat(np.max(np.abs(data)), data.shape[0],1)
-        
-        channel = 1 # second channel
-        sampling_rate = 48000
-        sound = data[:,channel]
-        sound = sound/np.max(np.abs(sound))*0.99
-
-        with closing(open(wavpath, 'wb')) as wav_file:
-            sio_wavfile.write(wav_file, sampling_rate, sound)
-            print(f"Wrote a new wav {wavpath}.")
+
+from .wav_handling import WavWriter, needs_rf64, sample_width
+
+# How many samples from the beginning of a .dat file are used to work out the
+# number of channels. The prefix is doubled until it is enough.
+CHANNEL_DETECTION_SAMPLES = 1 << 16
+# How many frames are converted at a time.
+FRAMES_PER_BLOCK = 1 << 18
+
+
+def detect_number_of_channels(data: np.ndarray,
+                              threshold: float = 0.0001) -> int:
+    """
+    Work out how many channels are interleaved in RASL .dat data.
+
+    The first channel repeats the value of the first sample once every frame,
+    so the channel count is the median distance between samples that are
+    within threshold of the first one. Only a prefix of data is looked at
+    unless that is too short to contain enough such samples.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        The samples of the .dat file as a 1D array, usually a memory map.
+    threshold : float, optional
+        How close a sample has to be to the first one, by default 0.0001
+
+    Returns
+    -------
+    int
+        Number of channels.
+
+    Raises
+    ------
+    ValueError
+        If the first sample does not repeat.
+    """
+    length = CHANNEL_DETECTION_SAMPLES
+    while True:
+        prefix = np.asarray(data[:length])
+        repeats = np.flatnonzero(np.abs(prefix[1:] - prefix[0]) < threshold)
+        if len(repeats) > 1 or length >= len(data):
+            break
+        length *= 2
+
+    if len(repeats) < 2:
+        raise ValueError("Could not find the frame length of the .dat file.")
+    return int(np.median(np.diff(repeats)))
+
+
+def dat_to_wav(datpath: Path, wavpath: Path,
+               sample_format: Optional[str] = None, dither: bool = False):
+    """
+    Convert the audio channel of a RASL .dat file into a wav file.
+
+    The .dat file is memory mapped and the audio channel is read through a
+    strided view one block of frames at a time, so the conversion needs the
+    same small amount of memory regardless of the size of the file. The
+    audio is normalised to a peak of 0.99 and converted to sample_format
+    block by block.
+
+    Parameters
+    ----------
+    datpath : Path
+        The .dat file.
+    wavpath : Path
+        Where to write the wav file.
+    sample_format : Optional[str], optional
+        Sample format of the wav: 'int16', 'int24' or 'float32', by default
+        None for float64.
+    dither : bool, optional
+        Add TPDF dither when converting to integers, by default False.
+    """
+    # Matlab version does a test here to decide if the
+    # recording is from Labview or RASL 1.0.
+    # We don't. We just blindly assume RASL 1.0
+    data = np.memmap(datpath, dtype='float', mode='r')
+    numberOfChannels = detect_number_of_channels(data)
+    if len(data) % numberOfChannels != 0:
+        raise ValueError(
+            f"{datpath} does not contain whole frames of "
+            f"{numberOfChannels} channels.")
+    data = data.reshape(-1, numberOfChannels)
+
+    # The commented out section below tries to replicate the batchDAT2WAV 
+    # behaviour but something makes difference 1D when it should be 2D.
+    # Since we are for the moment dealing with a steady data source, 
+    # we just hardcode the variables instead.
+
+    # print(data.shape)
+    # print(data[:8,:])
+    
+    # difference = np.diff(np.flipud(data[:,0]))
+
+    # print(np.flipud(data[:,3]).shape)
+    # plt.plot(data[:,3])
+    # plt.show()
+
+    # idx = np.nonzero(difference >= 2)#[0]
+    # idx = len(data[:,3]) - idx + 1
+    # data = data[:idx, :]
+
+    # # Define the DAT variables
+    # temp = np.diff(np.nonzero(data[:,0]>=1))/np.diff(data(np.nonzero(data[:,0]>=1)))
+    # sampling_rate = np.round(np.median(temp))
+    # if sampling_rate != 48000:
+    #     print(f'Calculated sampling rate {sampling_rate} is not equal to 48kHz.')
+    #     sampling_rate = 48000
+    # data = data/np.repmat(np.max(np.abs(data)), data.shape[0],1)
+    
+    channel = 1 # second channel
+    sampling_rate = 48000
+    sound = data[:, channel]
+
+    peak = 0.0
+    for begin in range(0, len(sound), FRAMES_PER_BLOCK):
+        block = sound[begin:begin + FRAMES_PER_BLOCK]
+        peak = max(peak, float(np.max(np.abs(block))))
+
+    if sample_format is None:
+        sample_format = "float64"
+    rf64 = needs_rf64(len(sound) * sample_width(sample_format))
+    with WavWriter(wavpath, sampling_rate, 1, sample_format,
+                   rf64=rf64, dither=dither) as writer:
+        for begin in range(0, len(sound), FRAMES_PER_BLOCK):
+            block = sound[begin:begin + FRAMES_PER_BLOCK]
+            writer.write_samples(block / peak * 0.99)
+    print(f"Wrote a new wav {wavpath}.")
@@ -44,13 +44,15 @@ from textgrids import TextGrid, Interval, Tier
 from .meta import (
     check_and_load_aaa_meta, check_and_load_csv_meta, check_and_load_rasl_meta
 )
+from .textgrid_io import load_textgrid, save_textgrid
+from .token_table import Token, TokenTable
 from .wav_handling import add_begin_end_from_wav
 
 pp = pprint.PrettyPrinter(indent=4)
 
 
 def generate_textgrid(
-        table: dict,
+        table: TokenTable,
         out_textgrid: TextGrid,
         config_dict: dict,
         pronunciation_dict: dict
@@ -59,6 +61,58 @@ def generate_textgrid(
     pass
 
 
+def append_tokens_to_textgrid(
+        textgrid: TextGrid, table: TokenTable, config_dict: dict
+) -> None:
+    """
+    Extend a concatenated TextGrid with intervals for appended recordings.
+
+    Existing intervals are not touched. Each interval tier gets new intervals
+    covering the appended recordings: The file tier gets the file names, the
+    utterance tier gets the prompts starting from 'begin', and other tiers
+    get empty intervals for the annotators to fill in. A gap between the old
+    end of a tier and the first appended recording is filled with an empty
+    interval.
+
+    Parameters
+    ----------
+    textgrid : TextGrid
+        The concatenated TextGrid.
+    table : TokenTable
+        Metadata of the appended recordings with timing info in order.
+    config_dict : dict
+        Configuration dictionary.
+    """
+    file_tier = config_dict['tier_names']['file']
+    utterance_tier = config_dict['tier_names']['utterance']
+    end = table[-1]['sliceEnd']
+
+    for name, tier in textgrid.items():
+        tier.xmax = end
+        if tier.is_point_tier:
+            continue
+
+        tier_end = tier[-1].xmax if tier else textgrid.xmin
+        if tier_end < table[0]['sliceBegin']:
+            tier.append(Interval('', tier_end, table[0]['sliceBegin']))
+
+        for entry in table:
+            if name == file_tier:
+                tier.append(Interval(
+                    entry['filename'], entry['sliceBegin'], entry['sliceEnd']))
+            elif name == utterance_tier:
+                if entry['begin'] > entry['sliceBegin']:
+                    tier.append(Interval(
+                        '', entry['sliceBegin'], entry['begin']))
+                tier.append(Interval(
+                    entry['prompt'], entry['begin'], entry['sliceEnd']))
+            else:
+                tier.append(Interval(
+                    '', entry['sliceBegin'], entry['sliceEnd']))
+
+    textgrid.xmax = end
+
+
 def add_tiers(
         path, config_dict: dict, pronunciation_dict: dict = None,
         csv_meta_file: Optional[str] = None
@@ -74,9 +128,10 @@ def add_tiers(
 
     if path.is_file():
         if path.suffix == ".TextGrid":
-            textgrid = TextGrid(str(path))
+            textgrid = load_textgrid(path)
             add_tiers_to_textgrid(textgrid, config_dict, pronunciation_dict)
-            textgrid.write(str(path))
+            save_textgrid(
+                textgrid, path, config_dict.get('textgrid_format'))
         else:
             print(f"Unknown file type: {path.suffix}. Exiting.")
             sys.exit()
@@ -88,10 +143,14 @@ def add_tiers(
                 speaker_id, path, test)
             ic(table)
         elif data_source == 'RASL':
-            table = check_and_load_rasl_meta(speaker_id, path, test)
+            table = check_and_load_rasl_meta(
+                speaker_id, path, test, config_dict['jobs'],
+                config_dict.get('output_sample_format'),
+                config_dict['dither'])
         elif data_source == 'csv':
             table = check_and_load_csv_meta(
-                speaker_id, path, test, csv_meta_file)
+                speaker_id, path, test, csv_meta_file,
+                config_dict.get('token_id_pattern'))
         else:
             print(f"Unknown data source: {data_source}. Exiting.")
             sys.exit()
@@ -100,18 +159,19 @@ def add_tiers(
             textgrid_file = path / (item['filename'] + ".TextGrid")
             ic(textgrid_file)
             if textgrid_file.is_file():
-                textgrid = TextGrid(textgrid_file)
+                textgrid = load_textgrid(textgrid_file)
             else:
                 textgrid = TextGrid()
                 add_begin_end_from_wav(item)
                 ic(item)
             add_tiers_to_textgrid(
                 textgrid, item, config_dict, pronunciation_dict)
-            textgrid.write(textgrid_file)
+            save_textgrid(
+                textgrid, textgrid_file, config_dict.get('textgrid_format'))
 
 
 def add_tiers_to_textgrid(
-        textgrid: TextGrid, params: dict, config_dict: dict,
+        textgrid: TextGrid, params: Token, config_dict: dict,
         pronunciation_dict: dict = None
 ) -> None:
     """
@@ -121,7 +181,7 @@ def add_tiers_to_textgrid(
     ----------
     textgrid : TextGrid
         The Tiers will be added to this TextGrid
-    params : dict
+    params : Token
         parameters for this recording
     config_dict : dict
         Configuration dictionary
@@ -186,13 +246,13 @@ def add_tiers_to_textgrid(
             config_dict['tier names']['phone'], segments)
 
 
-def append_beginning_intervals(entry: dict, tier: Tier) -> None:
+def append_beginning_intervals(entry: Token, tier: Tier) -> None:
     """
     Add Intervals for BEEP and silence to the Tier.
 
     Parameters
     ----------
-    entry : dict
+    entry : Token
         Metadata for the recording.
     tier : Tier
         Tier to add the Intervals to.
@@ -222,13 +282,13 @@ def append_beginning_intervals(entry: dict, tier: Tier) -> None:
         tier.append(begin_buffer)
 
 
-def append_beginning_dicts(entry: dict, intervals: list[dict]) -> None:
+def append_beginning_dicts(entry: Token, intervals: list[dict]) -> None:
     """
     Append dicts for BEEP and silence to the list of dicts.
 
     Parameters
     ----------
-    entry : dict
+    entry : Token
         Metadata for the recording.
     intervals : list[dict]
         The list of interval dicts.
@@ -265,14 +325,14 @@ def append_beginning_dicts(entry: dict, intervals: list[dict]) -> None:
         intervals.append(begin_buffer)
 
 
-def append_end_dict(entry: dict, intervals: list[dict]) -> None:
+def append_end_dict(entry: Token, intervals: list[dict]) -> None:
     """
     Append dict for silence at the end to the list of dicts.
 
 
     Parameters
     ----------
-    entry : dict
+    entry : Token
         Metadata for the recording.
     intervals : list[dict]
         The list of interval dicts.
@@ -284,13 +344,13 @@ def append_end_dict(entry: dict, intervals: list[dict]) -> None:
     intervals.append(end_buffer)
 
 
-def generate_utterance_dicts(entry: dict) -> list[dict]:
+def generate_utterance_dicts(entry: Token) -> list[dict]:
     """
     Generate an utterance Tier as a list of dicts.
 
     Parameters
     ----------
-    entry : dict
+    entry : Token
         Metadata for the recording.
     """
 
@@ -0,0 +1,711 @@
+#
+# Copyright (c) 2022-2024 Pertti Palo.
+#
+# This file is part of Computer Assisted Segmentation Tools
+# (see https://github.com/giuthas-speech-research-tools/cast/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# The example data packaged with this program is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License. You should have received a
+# copy of the Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License along with the data. If not,
+# see <https://creativecommons.org/licenses/by-nc-sa/4.0/> for details.
+#
+# When using the toolkit for scientific publications, please cite the
+# articles listed in README.markdown. They can also be found in
+# citations.bib in BibTeX format.
+#
+"""
+Reading and writing Praat TextGrids with the tiers held in numpy arrays.
+
+The long and short text formats and Praat's binary format are supported.
+Text files are tokenised in one go and each tier is converted into arrays in
+bulk, and written back a whole tier at a time. load_textgrid and
+save_textgrid read and write textgrids.TextGrid objects through the same code
+for the parts of CAST that work with them.
+"""
+
+import os
+import re
+import struct
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+from textgrids import Interval, Point, TextGrid, Tier
+
+from .path_functions import new_file_mode
+
+INTERVAL_TIER = "IntervalTier"
+POINT_TIERS = ("TextTier", "PointTier")
+
+# File formats.
+TEXT_LONG = "long"
+TEXT_SHORT = "short"
+BINARY = "binary"
+TEXTGRID_FORMATS = (TEXT_LONG, TEXT_SHORT, BINARY)
+
+# Binary files start with the file type followed by the object class as a
+# string with a one byte length. Numbers are big-endian. Strings with a
+# 16-bit length are ASCII unless the length is 0xFFFF, which means that the
+# real length in UTF-16 code units and the UTF-16 string follow.
+BINARY_HEADER = b"ooBinaryFile\x08TextGrid"
+UTF16_MARKER = 0xFFFF
+DOUBLE = struct.Struct('>d')
+TWO_DOUBLES = struct.Struct('>2d')
+TWO_DOUBLES_AND_BOOL = struct.Struct('>2d?')
+INT = struct.Struct('>i')
+UNSIGNED_SHORT = struct.Struct('>H')
+
+# Long format files have one value after ' = ' on each line.
+LONG_FORMAT_PATTERN = re.compile(r'^\s*xmin = ', re.MULTILINE)
+LONG_VALUE_PATTERN = re.compile(r' = (.*\S)')
+HEAD_LENGTH = 512
+
+# Praat text files contain strings, numbers, and <exists> or <absent>
+# flags. Everything else -- attribute names, '=', and indices in brackets --
+# is there for human readers and the same values come out of both long and
+# short files. Doubled quotes inside strings stand for a quote. This pattern
+# is only used for files with strings that span several lines.
+TOKEN_PATTERN = re.compile(
+    r'"((?:[^"]|"")*)"'
+    r'|(\[[^\]\n]*\])'
+    r'|<(exists|absent)>'
+    r'|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)'
+)
+
+
+@dataclass
+class TierArrays:
+    """
+    A TextGrid tier held in numpy arrays.
+
+    Attributes
+    ----------
+    name : str
+        Name of the tier.
+    xmin : float
+        Beginning of the tier.
+    xmax : float
+        End of the tier.
+    begins : np.ndarray
+        Beginnings of the intervals or the times of the points.
+    ends : np.ndarray
+        Ends of the intervals. For point tiers the same as begins.
+    label_indices : np.ndarray
+        Index of the label of each interval or point in labels.
+    labels : list[str]
+        The distinct labels on the tier.
+    is_point_tier : bool
+        True for point tiers, by default False.
+    """
+    name: str
+    xmin: float
+    xmax: float
+    begins: np.ndarray
+    ends: np.ndarray
+    label_indices: np.ndarray
+    labels: list[str]
+    is_point_tier: bool = False
+
+    @classmethod
+    def from_texts(
+            cls, name: str, begins, ends, texts: list[str],
+            xmin: float = 0.0, xmax: Optional[float] = None,
+            is_point_tier: bool = False
+    ) -> 'TierArrays':
+        """
+        Make a tier from times and texts.
+
+        For point tiers ends should be the same as begins. If xmax is not
+        given, the tier ends where its last element ends.
+        """
+        begins = np.asarray(begins, dtype=np.float64)
+        ends = np.asarray(ends, dtype=np.float64)
+        label_index = {}
+        label_indices = np.fromiter(
+            (label_index.setdefault(text, len(label_index))
+             for text in texts),
+            dtype=np.int32, count=len(texts))
+        if xmax is None:
+            xmax = float(ends[-1]) if len(ends) else xmin
+        return cls(name, float(xmin), float(xmax), begins, ends,
+                   label_indices, list(label_index), is_point_tier)
+
+    def __len__(self) -> int:
+        return len(self.begins)
+
+    @property
+    def texts(self) -> list[str]:
+        """Label of each interval or point in order."""
+        labels = self.labels
+        return [labels[index] for index in self.label_indices.tolist()]
+
+    def select(
+            self, index: Union[slice, np.ndarray], offset: float = 0.0,
+            xmin: Optional[float] = None, xmax: Optional[float] = None
+    ) -> 'TierArrays':
+        """
+        Return the elements picked by index as a new tier.
+
+        The times of the elements are moved by offset. The label table is
+        shared with this tier.
+        """
+        return TierArrays(
+            self.name,
+            self.xmin + offset if xmin is None else xmin,
+            self.xmax + offset if xmax is None else xmax,
+            self.begins[index] + offset,
+            self.ends[index] + offset,
+            self.label_indices[index],
+            self.labels,
+            self.is_point_tier)
+
+
+@dataclass
+class TextGridArrays:
+    """
+    A TextGrid whose tiers are held in numpy arrays.
+
+    Attributes
+    ----------
+    xmin : float
+        Beginning of the TextGrid.
+    xmax : float
+        End of the TextGrid.
+    tiers : dict[str, TierArrays]
+        The tiers by name in order.
+    file_format : str
+        The format the TextGrid was read from and will be written in by
+        default: TEXT_LONG, TEXT_SHORT, or BINARY. By default TEXT_LONG.
+    """
+    xmin: float = 0.0
+    xmax: float = 0.0
+    tiers: dict[str, TierArrays] = field(default_factory=dict)
+    file_format: str = TEXT_LONG
+
+    def add_tier(self, tier: TierArrays) -> None:
+        """Add tier replacing any tier with the same name."""
+        self.tiers[tier.name] = tier
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split the text of a TextGrid file into values line by line.
+
+    Strings are returned with their quotes and doubled quotes, flags as
+    '<exists>' or '<absent>' and numbers as they are written.
+
+    Every value is expected to be on its own line either after ' = ' (long
+    format) or alone (short format). Strings which span several lines are
+    left in pieces and need tokenize_strictly.
+    """
+    head = text[:HEAD_LENGTH]
+    if LONG_FORMAT_PATTERN.search(head):
+        # The only value not preceded by ' = ' is the tiers flag.
+        values = LONG_VALUE_PATTERN.findall(text)
+        flag = '<exists>' if 'tiers? <exists>' in head else '<absent>'
+        values.insert(4, flag)
+        return values
+
+    # In short files only the header has values after ' = '.
+    lines = [line.strip() for line in text.splitlines()]
+    return [line if line[:1] == '"' else line.partition(' = ')[2] or line
+            for line in lines if line]
+
+
+def tokenize_strictly(text: str) -> list[str]:
+    """
+    Split the text of a TextGrid file into values with a regular expression.
+
+    Slower than tokenize but does not assume anything about line breaks.
+    """
+    values = []
+    for string, brackets, flag, number in TOKEN_PATTERN.findall(text):
+        if brackets:
+            continue
+        if flag:
+            values.append(f'<{flag}>')
+        elif number:
+            values.append(number)
+        else:
+            values.append(f'"{string}"')
+    return values
+
+
+def _unescape(value: str) -> str:
+    return value[1:-1].replace('""', '"')
+
+
+def _escape(text: str) -> str:
+    return text.replace('"', '""')
+
+
+def parse_textgrid(text: str) -> TextGridArrays:
+    """
+    Parse a TextGrid in long or short text format.
+
+    Parameters
+    ----------
+    text : str
+        Contents of the TextGrid file.
+
+    Returns
+    -------
+    TextGridArrays
+        The parsed TextGrid.
+
+    Raises
+    ------
+    ValueError
+        If text is not a TextGrid in either of the text formats.
+    """
+    try:
+        return parse_tokens(tokenize(text))
+    except ValueError:
+        # Most likely a label with a line break in it.
+        return parse_tokens(tokenize_strictly(text))
+
+
+def parse_tokens(tokens: list[str]) -> TextGridArrays:
+    """Parse a TextGrid from the values returned by tokenize."""
+    if (len(tokens) < 5 or tokens[0] != '"ooTextFile"' or
+            tokens[1] != '"TextGrid"'):
+        raise ValueError("Not a TextGrid in text format.")
+
+    def number(position: int) -> float:
+        try:
+            return float(tokens[position])
+        except (IndexError, ValueError) as error:
+            raise ValueError(
+                f"Expected a number as value {position} of the TextGrid."
+            ) from error
+
+    def string(position: int) -> str:
+        if position >= len(tokens) or tokens[position][:1] != '"':
+            raise ValueError(
+                f"Expected a string as value {position} of the TextGrid.")
+        return _unescape(tokens[position])
+
+    grid = TextGridArrays(xmin=number(2), xmax=number(3))
+    if tokens[4] != '<exists>':
+        return grid
+
+    position = 6
+    for _ in range(int(number(5))):
+        tier_class = string(position)
+        name = string(position + 1)
+        xmin = number(position + 2)
+        xmax = number(position + 3)
+        size = int(number(position + 4))
+        position += 5
+
+        if tier_class == INTERVAL_TIER:
+            is_point_tier = False
+            elements = tokens[position:position + 3 * size]
+            begin_tokens = elements[0::3]
+            end_tokens = elements[1::3]
+            text_tokens = elements[2::3]
+            position += 3 * size
+        elif tier_class in POINT_TIERS:
+            is_point_tier = True
+            elements = tokens[position:position + 2 * size]
+            begin_tokens = end_tokens = elements[0::2]
+            text_tokens = elements[1::2]
+            position += 2 * size
+        else:
+            raise ValueError(f"Unknown tier class {tier_class} in TextGrid.")
+
+        if len(text_tokens) != size:
+            raise ValueError(f"TextGrid ends in the middle of tier {name}.")
+        if [token for token in text_tokens
+                if token[:1] != '"' or token[-1:] != '"' or len(token) < 2
+                or token.count('"') % 2]:
+            raise ValueError(f"Expected labels on tier {name}.")
+        try:
+            begins = np.array(list(map(float, begin_tokens)))
+            ends = np.array(list(map(float, end_tokens)))
+        except ValueError as error:
+            raise ValueError(
+                f"Expected times on tier {name}.") from error
+        texts = [_unescape(token) for token in text_tokens]
+
+        grid.add_tier(TierArrays.from_texts(
+            name, begins, ends, texts, xmin=xmin, xmax=xmax,
+            is_point_tier=is_point_tier))
+    return grid
+
+
+def _read_binary_string(data: bytes, offset: int) -> tuple[str, int]:
+    length, = UNSIGNED_SHORT.unpack_from(data, offset)
+    offset += UNSIGNED_SHORT.size
+    if length != UTF16_MARKER:
+        return data[offset:offset + length].decode('ascii'), offset + length
+    length, = UNSIGNED_SHORT.unpack_from(data, offset)
+    offset += UNSIGNED_SHORT.size
+    end = offset + 2 * length
+    return data[offset:end].decode('utf-16-be'), end
+
+
+def _binary_string(text: str) -> bytes:
+    try:
+        encoded = text.encode('ascii')
+        return UNSIGNED_SHORT.pack(len(encoded)) + encoded
+    except UnicodeEncodeError:
+        encoded = text.encode('utf-16-be')
+        return (UNSIGNED_SHORT.pack(UTF16_MARKER) +
+                UNSIGNED_SHORT.pack(len(encoded) // 2) + encoded)
+
+
+def parse_binary_textgrid(data: bytes) -> TextGridArrays:
+    """
+    Parse a TextGrid in Praat's binary format.
+
+    Parameters
+    ----------
+    data : bytes
+        Contents of the TextGrid file.
+
+    Returns
+    -------
+    TextGridArrays
+        The parsed TextGrid.
+
+    Raises
+    ------
+    ValueError
+        If data is not a binary TextGrid or ends too early.
+    """
+    if not data.startswith(BINARY_HEADER):
+        raise ValueError("Not a TextGrid in binary format.")
+    try:
+        offset = len(BINARY_HEADER)
+        xmin, xmax, exists = TWO_DOUBLES_AND_BOOL.unpack_from(data, offset)
+        offset += TWO_DOUBLES_AND_BOOL.size
+        grid = TextGridArrays(xmin=xmin, xmax=xmax, file_format=BINARY)
+        if not exists:
+            return grid
+        number_of_tiers, = INT.unpack_from(data, offset)
+        offset += INT.size
+
+        for _ in range(number_of_tiers):
+            class_length = data[offset]
+            tier_class = data[offset + 1:offset + 1 + class_length].decode(
+                'ascii')
+            offset += 1 + class_length
+            name, offset = _read_binary_string(data, offset)
+            tier_xmin, tier_xmax = TWO_DOUBLES.unpack_from(data, offset)
+            offset += TWO_DOUBLES.size
+            size, = INT.unpack_from(data, offset)
+            offset += INT.size
+
+            if tier_class == INTERVAL_TIER:
+                is_point_tier = False
+                times = TWO_DOUBLES
+            elif tier_class in POINT_TIERS:
+                is_point_tier = True
+                times = DOUBLE
+            else:
+                raise ValueError(
+                    f"Unknown tier class {tier_class} in TextGrid.")
+
+            elements = []
+            texts = []
+            for _ in range(size):
+                elements.append(times.unpack_from(data, offset))
+                text, offset = _read_binary_string(data, offset + times.size)
+                texts.append(text)
+
+            element_times = np.array(elements, dtype=np.float64).reshape(
+                size, times.size // DOUBLE.size)
+            grid.add_tier(TierArrays.from_texts(
+                name, element_times[:, 0], element_times[:, -1], texts,
+                xmin=tier_xmin, xmax=tier_xmax,
+                is_point_tier=is_point_tier))
+    except (struct.error, IndexError, UnicodeDecodeError) as error:
+        raise ValueError("Binary TextGrid is damaged.") from error
+    return grid
+
+
+def format_binary_textgrid(grid: TextGridArrays) -> bytes:
+    """Format grid as a TextGrid file in Praat's binary format."""
+    out = [BINARY_HEADER,
+           TWO_DOUBLES_AND_BOOL.pack(grid.xmin, grid.xmax, True),
+           INT.pack(len(grid.tiers))]
+    for name, tier in grid.tiers.items():
+        tier_class = (POINT_TIERS[0] if tier.is_point_tier
+                      else INTERVAL_TIER).encode('ascii')
+        out.append(bytes([len(tier_class)]) + tier_class)
+        out.append(_binary_string(name))
+        out.append(TWO_DOUBLES.pack(tier.xmin, tier.xmax))
+        out.append(INT.pack(len(tier)))
+
+        # Each distinct label is encoded once and the times of all elements
+        # are packed in one go.
+        labels = [_binary_string(label) for label in tier.labels]
+        if tier.is_point_tier:
+            times = tier.begins.astype('>f8').reshape(-1, 1)
+        else:
+            times = np.column_stack(
+                (tier.begins, tier.ends)).astype('>f8')
+        row_size = times.shape[1] * DOUBLE.size
+        time_bytes = times.tobytes()
+        out.extend([
+            time_bytes[i * row_size:(i + 1) * row_size] + labels[index]
+            for i, index in enumerate(tier.label_indices.tolist())])
+    return b''.join(out)
+
+
+def read_textgrid(filename: Union[str, Path]) -> TextGridArrays:
+    """
+    Read a TextGrid in long or short text format or in binary format.
+
+    The format is detected from the beginning of the file and recorded in
+    the file_format of the returned TextGrid. Text files starting with a
+    byte order mark are read as UTF-16, others as UTF-8.
+    """
+    with open(filename, 'rb') as textgrid_file:
+        data = textgrid_file.read()
+    return decode_textgrid(data)
+
+
+def decode_textgrid(data: bytes) -> TextGridArrays:
+    """Parse the contents of a TextGrid file in any of the formats."""
+    if data.startswith(BINARY_HEADER):
+        return parse_binary_textgrid(data)
+    if data[:2] in (b'\xfe\xff', b'\xff\xfe'):
+        text = data.decode('utf-16')
+    else:
+        text = data.decode('utf-8-sig')
+    grid = parse_textgrid(text)
+    if not LONG_FORMAT_PATTERN.search(text[:HEAD_LENGTH]):
+        grid.file_format = TEXT_SHORT
+    return grid
+
+
+def _format_times(tier: TierArrays) -> tuple[list[str], list[str]]:
+    """
+    Format the begin and end times of tier.
+
+    Formatting floats is the slowest part of writing, so when intervals
+    follow each other without gaps, the boundaries are formatted only once.
+    """
+    begins = list(map(str, tier.begins.tolist()))
+    if tier.is_point_tier:
+        return begins, begins
+    if len(tier) and np.array_equal(tier.ends[:-1], tier.begins[1:]):
+        return begins, begins[1:] + [str(tier.ends[-1].item())]
+    return begins, list(map(str, tier.ends.tolist()))
+
+
+def _format_texts(tier: TierArrays) -> list[str]:
+    labels = [_escape(label) for label in tier.labels]
+    return [labels[index] for index in tier.label_indices.tolist()]
+
+
+def _format_long_tier(tier: TierArrays, count: int) -> str:
+    texts = _format_texts(tier)
+    begins, ends = _format_times(tier)
+    if tier.is_point_tier:
+        header = (f'\n    item [{count}]:'
+                  f'\n        class = "{POINT_TIERS[0]}"'
+                  f'\n        name = "{_escape(tier.name)}"'
+                  f'\n        xmin = {tier.xmin}'
+                  f'\n        xmax = {tier.xmax}'
+                  f'\n        points: size = {len(tier)}')
+        return header + ''.join([
+            f'\n            points [{i}]:'
+            f'\n                xpos = {xpos}'
+            f'\n                text = "{text}"'
+            for i, xpos, text in zip(range(1, len(tier) + 1), begins, texts)])
+
+    header = (f'\n    item [{count}]:'
+              f'\n        class = "{INTERVAL_TIER}"'
+              f'\n        name = "{_escape(tier.name)}"'
+              f'\n        xmin = {tier.xmin}'
+              f'\n        xmax = {tier.xmax}'
+              f'\n        intervals: size = {len(tier)}')
+    return header + ''.join([
+        f'\n            intervals [{i}]:'
+        f'\n                xmin = {begin}'
+        f'\n                xmax = {end}'
+        f'\n                text = "{text}"'
+        for i, begin, end, text in zip(
+            range(1, len(tier) + 1), begins, ends, texts)])
+
+
+def _format_short_tier(tier: TierArrays) -> str:
+    texts = _format_texts(tier)
+    begins, ends = _format_times(tier)
+    tier_class = POINT_TIERS[0] if tier.is_point_tier else INTERVAL_TIER
+    header = (f'"{tier_class}"\n"{_escape(tier.name)}"\n'
+              f'{tier.xmin}\n{tier.xmax}\n{len(tier)}\n')
+    if tier.is_point_tier:
+        return header + ''.join([
+            f'{xpos}\n"{text}"\n'
+            for xpos, text in zip(begins, texts)])
+    return header + ''.join([
+        f'{begin}\n{end}\n"{text}"\n'
+        for begin, end, text in zip(begins, ends, texts)])
+
+
+def format_textgrid(grid: TextGridArrays, short: bool = False) -> str:
+    """
+    Format grid as a TextGrid file in long or short text format.
+
+    The layout is the same as the one written by the textgrids package.
+    """
+    xmin = float(grid.xmin)
+    xmax = float(grid.xmax)
+    if short:
+        return (f'File type = "ooTextFile"\nObject class = "TextGrid"\n\n'
+                f'{xmin}\n{xmax}\n<exists>\n{len(grid.tiers)}\n' +
+                ''.join([_format_short_tier(tier)
+                         for tier in grid.tiers.values()]))
+    return (f'File type = "ooTextFile"\nObject class = "TextGrid"\n\n'
+            f'xmin = {xmin}\nxmax = {xmax}\ntiers? <exists>\n'
+            f'size = {len(grid.tiers)}\nitem []:' +
+            ''.join([_format_long_tier(tier, count)
+                     for count, tier in enumerate(grid.tiers.values(), 1)]))
+
+
+def write_textgrid(
+        grid: TextGridArrays, filename: Union[str, Path],
+        file_format: Optional[str] = None
+) -> None:
+    """
+    Write grid into filename.
+
+    Parameters
+    ----------
+    grid : TextGridArrays
+        The TextGrid.
+    filename : Union[str, Path]
+        Where to write.
+    file_format : Optional[str], optional
+        TEXT_LONG or TEXT_SHORT for UTF-8 text, or BINARY. By default None
+        for the file_format of grid.
+    """
+    if file_format is None:
+        file_format = grid.file_format
+    if file_format == BINARY:
+        with open(filename, 'wb') as textgrid_file:
+            textgrid_file.write(format_binary_textgrid(grid))
+    elif file_format in (TEXT_LONG, TEXT_SHORT):
+        with open(filename, 'w', encoding='utf-8',
+                  newline='\n') as textgrid_file:
+            textgrid_file.write(format_textgrid(
+                grid, short=file_format == TEXT_SHORT))
+    else:
+        raise ValueError(f"Unknown TextGrid format {file_format}.")
+
+
+def write_textgrid_atomically(
+        grid: TextGridArrays, filename: Path,
+        file_format: Optional[str] = None
+) -> None:
+    """
+    Write grid into filename through a temporary file.
+
+    The TextGrid is first written to a temporary file in the same directory
+    and then renamed to filename, so filename is never left half written. An
+    existing filename keeps its permissions and a new one gets the default
+    permissions of the process.
+    """
+    handle, temp_name = tempfile.mkstemp(
+        dir=filename.parent, prefix=f".{filename.name}.", suffix=".tmp")
+    os.close(handle)
+    try:
+        write_textgrid(grid, temp_name, file_format)
+        os.chmod(temp_name, new_file_mode(filename))
+        os.replace(temp_name, filename)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+
+
+def from_textgrid(textgrid: TextGrid) -> TextGridArrays:
+    """
+    Convert a textgrids.TextGrid into a TextGridArrays.
+
+    As in the textgrids package, the tiers get the TextGrid's xmin and xmax.
+    """
+    grid = TextGridArrays(xmin=float(textgrid.xmin),
+                          xmax=float(textgrid.xmax))
+    for name, tier in textgrid.items():
+        if tier.is_point_tier:
+            begins = ends = [point.xpos for point in tier]
+        else:
+            begins = [interval.xmin for interval in tier]
+            ends = [interval.xmax for interval in tier]
+        grid.add_tier(TierArrays.from_texts(
+            name, begins, ends, [str(element.text) for element in tier],
+            xmin=grid.xmin, xmax=grid.xmax,
+            is_point_tier=tier.is_point_tier))
+    return grid
+
+
+def to_textgrid(grid: TextGridArrays) -> TextGrid:
+    """Convert a TextGridArrays into a textgrids.TextGrid."""
+    textgrid = TextGrid(xmin=grid.xmin)
+    textgrid.xmax = grid.xmax
+    for name, tier in grid.tiers.items():
+        if tier.is_point_tier:
+            elements = [Point(text, xpos) for xpos, text in zip(
+                tier.begins.tolist(), tier.texts)]
+        else:
+            elements = [Interval(text, begin, end)
+                        for begin, end, text in zip(
+                            tier.begins.tolist(), tier.ends.tolist(),
+                            tier.texts)]
+        # Tier takes its times from the elements if both are zero, which
+        # does not work for points, so the times are set afterwards.
+        textgrid[name] = Tier(elements, point_tier=tier.is_point_tier)
+        textgrid[name].xmin = tier.xmin
+        textgrid[name].xmax = tier.xmax
+    return textgrid
+
+
+def load_textgrid(filename: Union[str, Path]) -> TextGrid:
+    """
+    Read a TextGrid file into a textgrids.TextGrid.
+
+    The format of the file is stored in the file_format attribute of the
+    TextGrid.
+    """
+    grid = read_textgrid(filename)
+    textgrid = to_textgrid(grid)
+    textgrid.filename = filename
+    textgrid.file_format = grid.file_format
+    return textgrid
+
+
+def save_textgrid(
+        textgrid: TextGrid, filename: Union[str, Path],
+        file_format: Optional[str] = None
+) -> None:
+    """
+    Write a textgrids.TextGrid into filename.
+
+    By default the TextGrid is written in the format it was loaded from or
+    in the long text format if it was not loaded from a file.
+    """
+    grid = from_textgrid(textgrid)
+    grid.file_format = getattr(textgrid, 'file_format', TEXT_LONG)
+    write_textgrid(grid, filename, file_format)
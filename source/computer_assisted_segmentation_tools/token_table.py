@@ -0,0 +1,199 @@
+#
+# Copyright (c) 2022-2024 Pertti Palo.
+#
+# This file is part of Computer Assisted Segmentation Tools 
+# (see https://github.com/giuthas-speech-research-tools/cast/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# The example data packaged with this program is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License. You should have received a
+# copy of the Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License along with the data. If not,
+# see <https://creativecommons.org/licenses/by-nc-sa/4.0/> for details.
+#
+# When using the toolkit for scientific publications, please cite the
+# articles listed in README.markdown. They can also be found in
+# citations.bib in BibTeX format.
+#
+"""
+Per-recording metadata of a session.
+"""
+
+import math
+from typing import Any, Iterable, Sequence, Union
+
+import numpy as np
+
+# Fields holding times in seconds. Their missing value is NaN, for all other
+# fields it is None.
+TIMING_FIELDS = ('slice_begin', 'begin', 'end', 'slice_end', 'beep')
+
+# Keys used for the fields in csv files and elsewhere that are not valid
+# attribute names.
+KEY_TO_FIELD = {
+    'sliceBegin': 'slice_begin',
+    'sliceEnd': 'slice_end',
+    'has speech': 'has_speech',
+    'segment boundaries': 'segment_boundaries',
+}
+FIELD_TO_KEY = {field: key for key, field in KEY_TO_FIELD.items()}
+
+
+def is_missing(value: Any) -> bool:
+    """Is value the missing value of its field."""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class Token:
+    """
+    Metadata of one recording.
+
+    The fields are attributes held in __slots__, so a Token takes a fraction
+    of the memory of the dict it replaces. For compatibility Tokens can also
+    be used like dicts with the keys used in csv files: token['sliceBegin']
+    is token.slice_begin. A field whose value is missing -- None or NaN for
+    the timing fields -- is not 'in' the token and get returns the default
+    for it, but indexing returns the missing value instead of raising
+    KeyError.
+    """
+
+    __slots__ = (
+        'excluded', 'filename', 'id', 'speaker', 'prompt', 'token_id',
+        'wav_path', 'prompt_path', 'ultra_path', 'dat_path', 'dat_filename',
+        'trial_number', 'date_and_time', 'wav_info', 'transcription',
+        'segment_boundaries', 'has_speech') + TIMING_FIELDS
+
+    def __init__(self, **fields: Any) -> None:
+        """
+        Create a Token.
+
+        Parameters
+        ----------
+        **fields
+            Initial values of the fields keyed by field name or dict key.
+            Fields not given are missing, except for excluded which is False.
+        """
+        for field in self.__slots__:
+            setattr(self, field, None)
+        for field in TIMING_FIELDS:
+            setattr(self, field, math.nan)
+        self.excluded = False
+        for key, value in fields.items():
+            self[key] = value
+
+    @staticmethod
+    def _field(key: str) -> str:
+        field = KEY_TO_FIELD.get(key, key)
+        if field not in Token.__slots__:
+            raise KeyError(key)
+        return field
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, self._field(key))
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        setattr(self, self._field(key), value)
+
+    def __contains__(self, key: str) -> bool:
+        field = KEY_TO_FIELD.get(key, key)
+        return field in self.__slots__ and not is_missing(
+            getattr(self, field))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Value of key or default if it is missing."""
+        if key in self:
+            return self[key]
+        return default
+
+    def keys(self) -> list[str]:
+        """Keys of the fields that are not missing."""
+        return [FIELD_TO_KEY.get(field, field) for field in self.__slots__
+                if not is_missing(getattr(self, field))]
+
+    def as_dict(self) -> dict[str, Any]:
+        """The fields that are not missing as a dict."""
+        return {key: self[key] for key in self.keys()}
+
+    def __repr__(self) -> str:
+        return f"Token({self.as_dict()!r})"
+
+
+class TokenTable(list):
+    """
+    The Tokens of a session in order.
+
+    A list of Tokens which can also read and write a field of all of the
+    Tokens at once as a numpy array, so that timing arithmetic can be done
+    for the whole session in one go.
+    """
+
+    def __init__(self, tokens: Iterable[Token] = ()) -> None:
+        super().__init__(tokens)
+
+    def __getitem__(
+            self, index: Union[int, slice]
+    ) -> Union[Token, 'TokenTable']:
+        if isinstance(index, slice):
+            return TokenTable(super().__getitem__(index))
+        return super().__getitem__(index)
+
+    def included(self) -> 'TokenTable':
+        """The Tokens that are not excluded."""
+        return TokenTable(token for token in self if not token.excluded)
+
+    def column(self, key: str) -> np.ndarray:
+        """
+        Values of a field for all Tokens.
+
+        Timing fields are returned as float arrays with NaN for missing
+        values, other fields as object arrays.
+        """
+        return column(self, key)
+
+    def set_column(self, key: str, values: Sequence) -> None:
+        """Set a field of every Token from values in table order."""
+        set_column(self, key, values)
+
+
+def column(tokens: Sequence[Token], key: str) -> np.ndarray:
+    """
+    Values of a field for all of tokens.
+
+    See TokenTable.column.
+    """
+    field = Token._field(key)
+    if field in TIMING_FIELDS:
+        return np.fromiter((getattr(token, field) for token in tokens),
+                           dtype=np.float64, count=len(tokens))
+    values = np.empty(len(tokens), dtype=object)
+    values[:] = [getattr(token, field) for token in tokens]
+    return values
+
+
+def set_column(tokens: Sequence[Token], key: str, values: Sequence) -> None:
+    """
+    Set a field of every one of tokens from values in order.
+
+    See TokenTable.set_column.
+    """
+    field = Token._field(key)
+    if len(values) != len(tokens):
+        raise ValueError(
+            f"Got {len(values)} values for {len(tokens)} tokens.")
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    for token, value in zip(tokens, values):
+        setattr(token, field, value)
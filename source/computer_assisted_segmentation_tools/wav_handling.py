@@ -32,12 +32,818 @@
 Operations involving wav-files.
 """
 
-import scipy.io.wavfile as sio_wavfile
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+import numpy as np
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass(frozen=True)
+class WavInfo:
+    """
+    Format and layout of a wav file as read from its header.
+
+    Attributes
+    ----------
+    path : Path
+        Path to the wav file.
+    samplerate : int
+        Sample rate.
+    number_of_channels : int
+        Number of channels in each frame.
+    format_tag : int
+        WAVE_FORMAT_PCM or WAVE_FORMAT_IEEE_FLOAT. The actual format of
+        WAVE_FORMAT_EXTENSIBLE files is recorded here.
+    bits_per_sample : int
+        Bits per sample.
+    block_align : int
+        Bytes per frame.
+    data_offset : int
+        Offset of the first sample from the beginning of the file.
+    data_size : int
+        Size of the sample data in bytes.
+    rf64 : bool
+        True if the file is an RF64 file.
+    fact_offset : Optional[int]
+        Offset of the sample length in the fact chunk or None if the file has
+        no fact chunk.
+    file_size : int
+        Size of the whole file in bytes.
+    """
+    path: Path
+    samplerate: int
+    number_of_channels: int
+    format_tag: int
+    bits_per_sample: int
+    block_align: int
+    data_offset: int
+    data_size: int
+    rf64: bool = False
+    fact_offset: Optional[int] = None
+    file_size: int = 0
+
+    @property
+    def frame_count(self) -> int:
+        """Number of frames in the file."""
+        return self.data_size // self.block_align
+
+    @property
+    def duration(self) -> float:
+        """Duration of the file in seconds."""
+        return self.frame_count / float(self.samplerate)
+
+    @property
+    def sample_format(self) -> str:
+        """Sample format as a string like 'int16' or 'float32'."""
+        if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            return f"float{self.bits_per_sample}"
+        if self.bits_per_sample == 8:
+            return "uint8"
+        return f"int{self.bits_per_sample}"
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        The dtype scipy.io.wavfile.read returns the samples as.
+
+        24-bit samples are read into 32-bit integers.
+        """
+        if self.sample_format == "int24":
+            return np.dtype('int32')
+        return np.dtype(self.sample_format)
+
+    def is_compatible_with(self, other: 'WavInfo') -> bool:
+        """
+        Can the sample data of the two files be concatenated as is.
+
+        Parameters
+        ----------
+        other : WavInfo
+            The file to compare to.
+
+        Returns
+        -------
+        bool
+            True if sample rate, number of channels and sample format match.
+        """
+        return (self.samplerate == other.samplerate and
+                self.number_of_channels == other.number_of_channels and
+                self.sample_format == other.sample_format)
+
+
+def probe_wav(path: Union[Path, str]) -> WavInfo:
+    """
+    Read the format of a wav file from its header without reading samples.
+
+    Both RIFF and RF64 files are understood.
+
+    Parameters
+    ----------
+    path : Union[Path, str]
+        Path to the wav file.
+
+    Returns
+    -------
+    WavInfo
+        Format and layout of the file.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a PCM or IEEE float wav file.
+    """
+    path = Path(path)
+    file_size = path.stat().st_size
+    with open(path, 'rb') as wav_file:
+        riff_header = wav_file.read(12)
+        if (len(riff_header) < 12 or
+                riff_header[:4] not in (b'RIFF', b'RF64') or
+                riff_header[8:] != b'WAVE'):
+            raise ValueError(f"{path} is not a wav file.")
+
+        rf64_data_size = None
+        if riff_header[:4] == b'RF64':
+            ds64_header = wav_file.read(8)
+            if ds64_header[:4] != b'ds64':
+                raise ValueError(f"No ds64 chunk in RF64 file {path}.")
+            ds64_size = struct.unpack('<I', ds64_header[4:])[0]
+            ds64 = wav_file.read(ds64_size)
+            rf64_data_size = struct.unpack('<Q', ds64[8:16])[0]
+            wav_file.seek(ds64_size % 2, 1)
+
+        fmt = None
+        fact_offset = None
+        while True:
+            chunk_header = wav_file.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError(f"No data chunk found in {path}.")
+            chunk_id = chunk_header[:4]
+            chunk_size = struct.unpack('<I', chunk_header[4:])[0]
+
+            if chunk_id == b'fmt ':
+                fmt = wav_file.read(chunk_size)
+                if len(fmt) < 16:
+                    raise ValueError(f"Malformed fmt chunk in {path}.")
+                wav_file.seek(chunk_size % 2, 1)
+            elif chunk_id == b'fact' and chunk_size >= 4:
+                fact_offset = wav_file.tell()
+                wav_file.seek(chunk_size + chunk_size % 2, 1)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError(
+                        f"Data chunk before fmt chunk in {path}.")
+                if (rf64_data_size is not None and
+                        chunk_size == RIFF_SIZE_LIMIT):
+                    chunk_size = rf64_data_size
+                data_offset = wav_file.tell()
+                # Files written by streaming recorders may have a
+                # placeholder size or may have been truncated.
+                data_size = min(chunk_size, file_size - data_offset)
+                break
+            else:
+                wav_file.seek(chunk_size + chunk_size % 2, 1)
+
+    (format_tag, number_of_channels, samplerate, _, block_align,
+     bits_per_sample) = struct.unpack('<HHIIHH', fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE:
+        if len(fmt) < 26:
+            raise ValueError(f"Malformed extensible fmt chunk in {path}.")
+        # The format tag is in the first two bytes of the subformat GUID.
+        format_tag = struct.unpack('<H', fmt[24:26])[0]
+    if format_tag not in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT):
+        raise ValueError(
+            f"Unsupported wav format {format_tag:#06x} in {path}.")
+
+    return WavInfo(
+        path=path,
+        samplerate=samplerate,
+        number_of_channels=number_of_channels,
+        format_tag=format_tag,
+        bits_per_sample=bits_per_sample,
+        block_align=block_align,
+        data_offset=data_offset,
+        data_size=data_size,
+        rf64=rf64_data_size is not None,
+        fact_offset=fact_offset,
+        file_size=file_size)
+
+
+def read_wav_frames(wav_info: WavInfo) -> np.ndarray:
+    """
+    Memory-map the sample data of a wav file.
+
+    Nothing is read into memory until the returned array is accessed, so
+    slicing it reads only the requested frames even from files too large to
+    load whole. Works for RIFF and RF64 files.
+
+    Parameters
+    ----------
+    wav_info : WavInfo
+        Probed header of the file.
+
+    Returns
+    -------
+    np.ndarray
+        Read-only array of shape (frame_count,) for mono files and
+        (frame_count, number_of_channels) for multichannel files.
+
+    Raises
+    ------
+    ValueError
+        If the samples are 24-bit, which numpy can't map directly.
+    """
+    if wav_info.sample_format == "int24":
+        raise ValueError(
+            f"Can't memory-map 24-bit samples in {wav_info.path}.")
+    dtype = wav_info.dtype.newbyteorder('<')
+    if wav_info.number_of_channels == 1:
+        shape = (wav_info.frame_count,)
+    else:
+        shape = (wav_info.frame_count, wav_info.number_of_channels)
+    if wav_info.frame_count == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(wav_info.path, dtype=dtype, mode='r',
+                     offset=wav_info.data_offset, shape=shape)
 
 
 def add_begin_end_from_wav(item: dict) -> None:
-    (samplerate, frames) = sio_wavfile.read(item['wav_path'])
-    n_frames = frames.shape[0]
-    duration = n_frames / float(samplerate)
+    wav_info = probe_wav(item['wav_path'])
     item['begin'] = 0.0
-    item['end'] = duration
+    item['end'] = wav_info.duration
+
+
+# Largest size a RIFF or data chunk size field can hold. Files that
+# don't fit are written as RF64.
+RIFF_SIZE_LIMIT = 0xFFFFFFFF
+
+# Room left for the header when deciding if a file needs to be RF64.
+HEADER_MARGIN = 1024
+
+# Place of the 64-bit RIFF size in an RF64 header written by wav_header. It
+# is followed by the 64-bit data size and sample count.
+DS64_RIFF_SIZE_OFFSET = 20
+
+# Place of the sample length in the fact chunk written by wav_header. RF64
+# headers have the ds64 chunk before it.
+FACT_SAMPLE_LENGTH_OFFSET = 46
+DS64_CHUNK_SIZE = 36
+
+# Buffer size for copying sample data when the OS can't do it for us.
+COPY_BUFFER_SIZE = 16 * 1024 * 1024
+
+
+def needs_rf64(data_size: int) -> bool:
+    """
+    Is data_size bytes of sample data too much for a RIFF wav file.
+
+    Parameters
+    ----------
+    data_size : int
+        Size of the sample data in bytes.
+
+    Returns
+    -------
+    bool
+        True if the file has to be written as RF64.
+    """
+    return data_size + HEADER_MARGIN > RIFF_SIZE_LIMIT
+
+
+def wav_header(samplerate: int, number_of_channels: int, format_tag: int,
+               bits_per_sample: int, data_size: int = 0,
+               rf64: bool = False) -> bytes:
+    """
+    Generate a wav header that ends with the data chunk header.
+
+    IEEE float files get a fact chunk like scipy.io.wavfile writes them.
+    RF64 headers follow EBU Tech 3306 like scipy.io.wavfile writes them: The
+    32-bit size fields are set to 0xFFFFFFFF and the real sizes are in a ds64
+    chunk right after the RF64 header.
+
+    Parameters
+    ----------
+    samplerate : int
+        Sample rate.
+    number_of_channels : int
+        Number of channels in each frame.
+    format_tag : int
+        WAVE_FORMAT_PCM or WAVE_FORMAT_IEEE_FLOAT.
+    bits_per_sample : int
+        Bits per sample.
+    data_size : int, optional
+        Size of the sample data in bytes, by default 0 for a placeholder to
+        be patched later.
+    rf64 : bool, optional
+        Generate an RF64 header, by default False.
+
+    Returns
+    -------
+    bytes
+        The header.
+    """
+    block_align = number_of_channels * ((bits_per_sample + 7) // 8)
+    frame_count = data_size // block_align
+    fmt_chunk = struct.pack(
+        '<HHIIHH', format_tag, number_of_channels, samplerate,
+        samplerate * block_align, block_align, bits_per_sample)
+    if format_tag != WAVE_FORMAT_PCM:
+        # Non-PCM formats carry a cbSize field and a fact chunk.
+        fmt_chunk += struct.pack('<H', 0)
+
+    chunks = b'fmt ' + struct.pack('<I', len(fmt_chunk)) + fmt_chunk
+    if format_tag != WAVE_FORMAT_PCM:
+        chunks += b'fact' + struct.pack(
+            '<II', 4, min(frame_count, RIFF_SIZE_LIMIT))
+
+    if not rf64:
+        chunks += b'data' + struct.pack('<I', data_size)
+        riff_size = 4 + len(chunks) + data_size + data_size % 2
+        return b'RIFF' + struct.pack('<I', riff_size) + b'WAVE' + chunks
+
+    chunks += b'data' + struct.pack('<I', RIFF_SIZE_LIMIT)
+    riff_size = (4 + DS64_CHUNK_SIZE + len(chunks) + data_size +
+                 data_size % 2)
+    ds64_chunk = b'ds64' + struct.pack(
+        '<IQQQI', DS64_CHUNK_SIZE - 8, riff_size, data_size, frame_count, 0)
+    return (b'RF64' + struct.pack('<I', RIFF_SIZE_LIMIT) + b'WAVE' +
+            ds64_chunk + chunks)
+
+
+def copy_sample_data(source: BinaryIO, destination: BinaryIO,
+                     offset: int, count: int) -> None:
+    """
+    Copy count bytes starting at offset in source to the end of destination.
+
+    Where the OS supports it the copy is done in the kernel with
+    os.copy_file_range, otherwise with large buffered reads and writes.
+
+    Parameters
+    ----------
+    source : BinaryIO
+        File to copy from.
+    destination : BinaryIO
+        File to copy to. Its position is moved to the end of the copied data.
+    offset : int
+        Where to start copying from in source.
+    count : int
+        Number of bytes to copy.
+    """
+    destination.flush()
+    position = destination.tell()
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while count > 0:
+                copied = os.copy_file_range(
+                    source.fileno(), destination.fileno(), count,
+                    offset, position)
+                if copied == 0:
+                    break
+                offset += copied
+                position += copied
+                count -= copied
+        except OSError:
+            # Not supported between these files, copy the rest by hand.
+            pass
+        destination.seek(position)
+
+    source.seek(offset)
+    while count > 0:
+        buffer = source.read(min(COPY_BUFFER_SIZE, count))
+        if not buffer:
+            raise ValueError(f"Unexpected end of file in {source.name}.")
+        destination.write(buffer)
+        count -= len(buffer)
+
+
+# Sample formats audio can be converted to on output.
+OUTPUT_SAMPLE_FORMATS = ("int16", "int24", "float32")
+
+
+def frame_dtype(sample_format: str) -> np.dtype:
+    """
+    The dtype frames of sample_format are held in.
+
+    24-bit samples are held in the top three bytes of 32-bit integers as
+    scipy.io.wavfile reads them.
+
+    Parameters
+    ----------
+    sample_format : str
+        Sample format like 'int16', 'int24' or 'float32'.
+
+    Returns
+    -------
+    np.dtype
+        The dtype.
+    """
+    if sample_format == "int24":
+        return np.dtype('int32')
+    return np.dtype(sample_format)
+
+
+def sample_width(sample_format: str) -> int:
+    """Size of one sample of sample_format in a wav file in bytes."""
+    if sample_format == "int24":
+        return 3
+    return frame_dtype(sample_format).itemsize
+
+
+def frames_to_float(frames: np.ndarray) -> np.ndarray:
+    """
+    Scale frames of any sample format to floats in [-1, 1).
+
+    Parameters
+    ----------
+    frames : np.ndarray
+        Integer or floating point frames. 24-bit frames should be held in
+        32-bit integers as returned by scipy.io.wavfile.
+
+    Returns
+    -------
+    np.ndarray
+        The frames as float64.
+    """
+    if frames.dtype.kind == 'f':
+        return frames.astype(np.float64, copy=False)
+    if frames.dtype.kind == 'u':
+        half_range = 2.0 ** (frames.dtype.itemsize * 8 - 1)
+        return (frames.astype(np.float64) - half_range) / half_range
+    return frames / 2.0 ** (frames.dtype.itemsize * 8 - 1)
+
+
+def convert_frames(frames: np.ndarray, sample_format: str,
+                   dither: bool = False,
+                   rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Convert frames into another sample format.
+
+    Integers are scaled to the full range of the new format. When converting
+    to an integer format the samples can be dithered with triangular (TPDF)
+    noise of one least significant bit before rounding. Out of range samples
+    are clipped.
+
+    Parameters
+    ----------
+    frames : np.ndarray
+        Frames in any sample format.
+    sample_format : str
+        One of OUTPUT_SAMPLE_FORMATS or any other format numpy knows of.
+    dither : bool, optional
+        Add TPDF dither when converting to integers, by default False.
+    rng : Optional[np.random.Generator], optional
+        Source of the dither noise, by default None for a new one.
+
+    Returns
+    -------
+    np.ndarray
+        Frames of dtype frame_dtype(sample_format).
+    """
+    dtype = frame_dtype(sample_format)
+    samples = frames_to_float(frames)
+    if dtype.kind == 'f':
+        return samples.astype(dtype)
+
+    bits = 24 if sample_format == "int24" else dtype.itemsize * 8
+    full_scale = 2.0 ** (bits - 1)
+    samples = samples * full_scale
+    if dither:
+        if rng is None:
+            rng = np.random.default_rng()
+        samples += rng.random(samples.shape)
+        samples -= rng.random(samples.shape)
+    np.rint(samples, out=samples)
+    np.clip(samples, -full_scale, full_scale - 1, out=samples)
+    if dtype.kind == 'u':
+        samples += full_scale
+    converted = samples.astype(dtype)
+    if sample_format == "int24":
+        converted <<= 8
+    return converted
+
+
+def splice_wavs(path: Union[Path, str], wav_infos: list[WavInfo]) -> None:
+    """
+    Concatenate wav files by copying their sample data as is.
+
+    The files must all have the same format. Nothing is decoded: The header
+    is generated from the probed sizes and the data chunks are copied one
+    after the other into the new file. If the result would be too large for
+    a RIFF file, an RF64 file is written instead.
+
+    Parameters
+    ----------
+    path : Union[Path, str]
+        Where to write the concatenated wav file.
+    wav_infos : list[WavInfo]
+        Probed headers of the files to concatenate in order.
+    """
+    first = wav_infos[0]
+    for wav_info in wav_infos[1:]:
+        if not wav_info.is_compatible_with(first):
+            raise ValueError(
+                f"Format of {wav_info.path} does not match {first.path}.")
+
+    data_size = sum(
+        wav_info.frame_count * wav_info.block_align for wav_info in wav_infos)
+    header = wav_header(first.samplerate, first.number_of_channels,
+                        first.format_tag, first.bits_per_sample, data_size,
+                        rf64=needs_rf64(data_size))
+
+    with open(path, 'wb') as output:
+        output.write(header)
+        for wav_info in wav_infos:
+            with open(wav_info.path, 'rb') as source:
+                copy_sample_data(
+                    source, output, wav_info.data_offset,
+                    wav_info.frame_count * wav_info.block_align)
+        if data_size % 2:
+            output.write(b'\x00')
+
+
+class WavWriter:
+    """
+    Write a wav file incrementally one block of frames at a time.
+
+    The header is written with placeholder sizes when the file is opened and
+    the RIFF and data chunk sizes are patched in when the writer is closed.
+    This means that only the block currently being written needs to be held
+    in memory.
+
+    Whether the file will be larger than 4 GiB needs to be known when it is
+    opened so that an RF64 header can be written.
+
+    Frames are passed to write in the writer's sample format. write_samples
+    converts frames of any other format first.
+
+    Use as a context manager:
+
+        with WavWriter(path, samplerate, number_of_channels, dtype) as writer:
+            for frames in blocks:
+                writer.write(frames)
+    """
+
+    def __init__(self, path: Union[Path, str], samplerate: int,
+                 number_of_channels: int, dtype: Union[np.dtype, str],
+                 rf64: bool = False, dither: bool = False) -> None:
+        """
+        Open path for writing and write a placeholder header.
+
+        Parameters
+        ----------
+        path : Union[Path, str]
+            Where to write the wav file.
+        samplerate : int
+            Sample rate of the file.
+        number_of_channels : int
+            Number of channels in each frame.
+        dtype : Union[np.dtype, str]
+            Sample format of the file. Integer types are written as PCM and
+            floating point types as IEEE float. 'int24' writes 24-bit PCM
+            from frames held in int32.
+        rf64 : bool, optional
+            Write an RF64 file, by default False. Use needs_rf64 to decide.
+        dither : bool, optional
+            Dither when write_samples converts frames to an integer format,
+            by default False.
+        """
+        self.path = Path(path)
+        self.samplerate = int(samplerate)
+        self.number_of_channels = int(number_of_channels)
+        if isinstance(dtype, str) and dtype == "int24":
+            self.sample_format = dtype
+        else:
+            self.sample_format = np.dtype(dtype).name
+        self.dtype = frame_dtype(self.sample_format).newbyteorder('<')
+        if self.dtype.kind not in 'iuf':
+            raise ValueError(f"Unsupported sample format: {self.dtype}.")
+        self.rf64 = rf64
+        self._set_sample_width()
+        self.dither = dither
+        self._rng = None
+        self.bytes_written = 0
+        self.frames_written = 0
+        self._appended_to = None
+
+        self._file: Optional[BinaryIO] = open(self.path, 'wb')
+        self._write_header()
+
+    def _set_sample_width(self) -> None:
+        """Set the size of samples and frames in the file."""
+        self.sample_width = sample_width(self.sample_format)
+        self.block_align = self.number_of_channels * self.sample_width
+
+    def _write_header(self) -> None:
+        """Write the header with placeholder sizes and note their places."""
+        is_float = self.dtype.kind == 'f'
+        format_tag = WAVE_FORMAT_IEEE_FLOAT if is_float else WAVE_FORMAT_PCM
+        header = wav_header(self.samplerate, self.number_of_channels,
+                            format_tag, self.sample_width * 8,
+                            rf64=self.rf64)
+        self._file.write(header)
+        self._fact_offset = None
+        if is_float:
+            self._fact_offset = FACT_SAMPLE_LENGTH_OFFSET
+            if self.rf64:
+                self._fact_offset += DS64_CHUNK_SIZE
+        self._data_size_offset = len(header) - 4
+        self._data_offset = len(header)
+
+    @classmethod
+    def open_for_append(cls, wav_info: WavInfo,
+                        dither: bool = False) -> 'WavWriter':
+        """
+        Open an existing wav file for appending more frames to it.
+
+        The data chunk has to be the last chunk in the file. The existing
+        header is kept and its sizes are updated when the writer is closed.
+        If the with block exits with an exception, the appended frames are
+        cut off again and the file is left as it was.
+
+        Parameters
+        ----------
+        wav_info : WavInfo
+            Probed header of the file.
+        dither : bool, optional
+            Dither when write_samples converts frames to an integer format,
+            by default False.
+
+        Returns
+        -------
+        WavWriter
+            Writer positioned at the end of the existing sample data.
+
+        Raises
+        ------
+        ValueError
+            If there are other chunks after the data chunk.
+        """
+        data_end = wav_info.data_offset + wav_info.data_size
+        if wav_info.file_size > data_end + wav_info.data_size % 2:
+            raise ValueError(
+                f"Can't append to {wav_info.path}: "
+                "There are other chunks after the sample data.")
+
+        writer = cls.__new__(cls)
+        writer.path = wav_info.path
+        writer.samplerate = wav_info.samplerate
+        writer.number_of_channels = wav_info.number_of_channels
+        writer.sample_format = wav_info.sample_format
+        writer.dtype = wav_info.dtype.newbyteorder('<')
+        writer.rf64 = wav_info.rf64
+        writer._set_sample_width()
+        writer.dither = dither
+        writer._rng = None
+        writer.bytes_written = wav_info.frame_count * wav_info.block_align
+        writer.frames_written = wav_info.frame_count
+        writer._appended_to = (writer.bytes_written, writer.frames_written)
+        writer._fact_offset = wav_info.fact_offset
+        writer._data_size_offset = wav_info.data_offset - 4
+        writer._data_offset = wav_info.data_offset
+
+        writer._file = open(wav_info.path, 'r+b')
+        # Any pad byte or trailing partial frame gets overwritten.
+        writer._file.seek(wav_info.data_offset + writer.bytes_written)
+        writer._file.truncate()
+        return writer
+
+    def copy_frames_from(self, wav_info: WavInfo) -> None:
+        """
+        Append the sample data of another wav file without decoding it.
+
+        Parameters
+        ----------
+        wav_info : WavInfo
+            Probed header of the file to copy from. It must have the same
+            sample rate, number of channels and frame size as this file.
+        """
+        if (wav_info.samplerate != self.samplerate or
+                wav_info.number_of_channels != self.number_of_channels or
+                wav_info.block_align != self.block_align):
+            raise ValueError(
+                f"Format of {wav_info.path} does not match {self.path}.")
+        count = wav_info.frame_count * wav_info.block_align
+        with open(wav_info.path, 'rb') as source:
+            copy_sample_data(source, self._file, wav_info.data_offset, count)
+        self.bytes_written += count
+        self.frames_written += wav_info.frame_count
+
+    def write(self, frames: np.ndarray) -> None:
+        """
+        Append frames to the data chunk.
+
+        Parameters
+        ----------
+        frames : np.ndarray
+            Frames as a (n_frames,) array for mono files or a (n_frames,
+            number_of_channels) array for multichannel files. Must be of the
+            writer's sample format.
+        """
+        if frames.dtype.kind != self.dtype.kind or (
+                frames.dtype.itemsize != self.dtype.itemsize):
+            raise ValueError(
+                f"Frames of type {frames.dtype} can't be written "
+                f"to a file of type {self.dtype}.")
+        if frames.ndim == 1:
+            n_channels = 1
+        else:
+            n_channels = frames.shape[1]
+        if n_channels != self.number_of_channels:
+            raise ValueError(
+                f"Frames have {n_channels} channels, expected "
+                f"{self.number_of_channels}.")
+        if n_channels * self.sample_width != self.block_align:
+            raise ValueError(
+                f"Frames of type {frames.dtype} don't match the "
+                f"{self.block_align} byte frames of {self.path}.")
+
+        data = np.ascontiguousarray(frames, dtype=self.dtype)
+        if self.sample_format == "int24":
+            # Keep the top three bytes of each little endian int32.
+            data = data.reshape(-1).view(np.uint8).reshape(-1, 4)[:, 1:]
+        data = data.tobytes()
+        self._file.write(data)
+        self.bytes_written += len(data)
+        self.frames_written += frames.shape[0]
+
+    def write_samples(self, frames: np.ndarray,
+                      sample_format: Optional[str] = None) -> None:
+        """
+        Append frames of any sample format to the data chunk.
+
+        Frames that are not in the writer's sample format are converted with
+        convert_frames first.
+
+        Parameters
+        ----------
+        frames : np.ndarray
+            Frames shaped as for write.
+        sample_format : Optional[str], optional
+            Sample format of frames, by default None for frames.dtype. Pass
+            'int24' for 24-bit frames held in int32.
+        """
+        if sample_format is None:
+            sample_format = frames.dtype.name
+        if sample_format != self.sample_format:
+            if self.dither and self._rng is None:
+                self._rng = np.random.default_rng()
+            frames = convert_frames(
+                frames, self.sample_format, self.dither, self._rng)
+        self.write(frames)
+
+    def close(self) -> None:
+        """Patch the chunk sizes into the header and close the file."""
+        if self._file is None:
+            return
+        if self.bytes_written % 2:
+            # RIFF chunks are word aligned.
+            self._file.write(b'\x00')
+        riff_size = self._file.tell() - 8
+        if self._fact_offset is not None:
+            self._file.seek(self._fact_offset)
+            self._file.write(struct.pack(
+                '<I', min(self.frames_written, RIFF_SIZE_LIMIT)))
+        if self.rf64:
+            self._file.seek(DS64_RIFF_SIZE_OFFSET)
+            self._file.write(struct.pack(
+                '<QQQ', riff_size, self.bytes_written, self.frames_written))
+        elif riff_size > RIFF_SIZE_LIMIT:
+            self._file.close()
+            self._file = None
+            raise ValueError(
+                f"{self.path} grew too large for a RIFF wav file. "
+                "It should have been opened as RF64.")
+        else:
+            self._file.seek(4)
+            self._file.write(struct.pack('<I', riff_size))
+            self._file.seek(self._data_size_offset)
+            self._file.write(struct.pack('<I', self.bytes_written))
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> 'WavWriter':
+        return self
+
+    def discard_appended_frames(self) -> None:
+        """
+        Cut off the frames appended since open_for_append.
+
+        The sizes in the header are set back to those of the original sample
+        data when the writer is closed.
+        """
+        if self._file is None or self._appended_to is None:
+            return
+        self.bytes_written, self.frames_written = self._appended_to
+        self._file.seek(self._data_offset + self.bytes_written)
+        self._file.truncate()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is not None:
+            self.discard_appended_frames()
+        self.close()
@@ -0,0 +1,73 @@
+#
+# Copyright (c) 2022-2024 Pertti Palo.
+#
+# This file is part of Computer Assisted Segmentation Tools
+# (see https://github.com/giuthas-speech-research-tools/cast/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# The example data packaged with this program is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License. You should have received a
+# copy of the Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License along with the data. If not,
+# see <https://creativecommons.org/licenses/by-nc-sa/4.0/> for details.
+#
+"""Tests for removing empty intervals from TextGrids."""
+
+import os
+import stat
+
+from source.computer_assisted_segmentation_tools.clean_textgrids import (
+    remove_empty_intervals, remove_empty_intervals_from_textgrids)
+from source.computer_assisted_segmentation_tools.textgrid_io import (
+    TextGridArrays, TierArrays, read_textgrid, write_textgrid)
+
+
+def make_grid() -> TextGridArrays:
+    """Make a TextGrid with empty intervals between the words."""
+    grid = TextGridArrays(xmin=0.0, xmax=2.0)
+    grid.add_tier(TierArrays.from_texts(
+        'Word', [0.0, 0.5, 1.0, 1.2, 1.5], [0.5, 1.0, 1.2, 1.5, 2.0],
+        ['', 'one', '', 'two', ''], xmax=2.0))
+    return grid
+
+
+def test_remove_empty_intervals_merges_into_preceding_interval():
+    tier = TierArrays.from_texts(
+        'Word', [0.0, 0.5, 0.7, 0.9, 1.2, 1.5], [0.5, 0.7, 0.9, 1.2, 1.5, 2.0],
+        ['', 'one', '', '', 'two', ''], xmax=2.0)
+    cleaned = remove_empty_intervals(tier)
+    assert cleaned.texts == ['', 'one', 'two', '']
+    assert list(cleaned.begins) == [0.0, 0.5, 1.2, 1.5]
+    assert list(cleaned.ends) == [0.5, 1.2, 1.5, 2.0]
+
+
+def test_remove_empty_intervals_keeps_tiers_without_empty_intervals():
+    tier = TierArrays.from_texts(
+        'Word', [0.0, 0.5, 1.0], [0.5, 1.0, 2.0], ['', 'one', ''], xmax=2.0)
+    assert remove_empty_intervals(tier) is tier
+
+
+def test_in_place_cleaning_keeps_file_mode(tmp_path):
+    path = tmp_path / 'token.TextGrid'
+    write_textgrid(make_grid(), path)
+    os.chmod(path, 0o640)
+
+    remove_empty_intervals_from_textgrids(tmp_path, tmp_path, in_place=True)
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    tier = read_textgrid(path).tiers['Word']
+    assert tier.texts == ['', 'one', 'two', '']
+    assert list(tier.ends) == [0.5, 1.2, 1.5, 2.0]
@@ -0,0 +1,104 @@
+#
+# Copyright (c) 2022-2024 Pertti Palo.
+#
+# This file is part of Computer Assisted Segmentation Tools
+# (see https://github.com/giuthas-speech-research-tools/cast/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# The example data packaged with this program is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License. You should have received a
+# copy of the Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License along with the data. If not,
+# see <https://creativecommons.org/licenses/by-nc-sa/4.0/> for details.
+#
+"""Tests for concatenate and the shard manifest it leaves behind."""
+
+import csv
+from pathlib import Path
+
+import numpy as np
+import scipy.io.wavfile as sio_wavfile
+from textgrids import TextGrid
+
+from source.computer_assisted_segmentation_tools.concatenate import (
+    concatenate_wavs)
+from source.computer_assisted_segmentation_tools.csv_output import (
+    shard_manifest_path)
+from source.computer_assisted_segmentation_tools.extract import (
+    extract_textgrids)
+from source.computer_assisted_segmentation_tools.meta.cast_meta import (
+    Datasource)
+
+
+def write_recordings(directory: Path, number_of_recordings: int = 4) -> None:
+    """Write short AAA style recordings with their prompt files."""
+    sampling_rate = 16000
+    rng = np.random.default_rng(0)
+    for i in range(number_of_recordings):
+        samples = rng.normal(0, 100, int((2.0 + 0.3 * i) * sampling_rate))
+        sio_wavfile.write(
+            directory / f"tok{i:03d}.wav", sampling_rate,
+            samples.astype(np.int16))
+        (directory / f"tok{i:03d}.txt").write_text(f"word{i}\n")
+
+
+def write_textgrid(outputfile: Path) -> None:
+    """Write a TextGrid with one interval per row of the results csv."""
+    with outputfile.with_suffix('.csv').open('r', newline='') as csvfile:
+        rows = list(csv.DictReader(csvfile, quoting=csv.QUOTE_NONNUMERIC))
+    intervals = [
+        {'label': row['prompt'],
+         'begin': row['sliceBegin'],
+         'end': row['sliceEnd']}
+        for row in rows]
+    textgrid = TextGrid()
+    textgrid.interval_tier_from_array('Utterance', intervals)
+    textgrid.write(str(outputfile.with_suffix('.TextGrid')))
+
+
+def test_unsharded_rerun_removes_shard_manifest(tmp_path):
+    recordings = tmp_path / 'recordings'
+    recordings.mkdir()
+    write_recordings(recordings)
+    outputfile = tmp_path / 'cat'
+    config_dict = {
+        'outputfile': outputfile,
+        'exclusion list': tmp_path / 'no_exclusions.yml',
+        'flags': {'detect beep': False},
+        'speaker id': 'test_speaker',
+        'test': False,
+        'data source': Datasource.AAA,
+        'jobs': 1,
+        'dither': False,
+        'max_shard_duration': 5.0,
+    }
+
+    concatenate_wavs(recordings, config_dict)
+    assert shard_manifest_path(outputfile).is_file()
+    assert (tmp_path / 'cat_001.wav').is_file()
+
+    del config_dict['max_shard_duration']
+    concatenate_wavs(recordings, config_dict)
+    assert not shard_manifest_path(outputfile).exists()
+    # Old shards may hold annotations and are left alone.
+    assert (tmp_path / 'cat_001.wav').is_file()
+
+    write_textgrid(outputfile)
+    extracted = tmp_path / 'extracted'
+    extracted.mkdir()
+    extract_textgrids(extracted, outputfile)
+    assert sorted(path.name for path in extracted.iterdir()) == [
+        f"tok{i:03d}.TextGrid" for i in range(4)]
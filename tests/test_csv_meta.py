@@ -0,0 +1,91 @@
+#
+# Copyright (c) 2022-2024 Pertti Palo.
+#
+# This file is part of Computer Assisted Segmentation Tools
+# (see https://github.com/giuthas-speech-research-tools/cast/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# The example data packaged with this program is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License. You should have received a
+# copy of the Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License along with the data. If not,
+# see <https://creativecommons.org/licenses/by-nc-sa/4.0/> for details.
+#
+"""Tests for the csv metadata loader and its index."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from source.computer_assisted_segmentation_tools.meta import csv_meta
+from source.computer_assisted_segmentation_tools.meta.csv_meta import (
+    CSV_INDEX_SUFFIX, CSV_INDEX_VERSION, read_csv_index, read_csv_rows)
+from source.computer_assisted_segmentation_tools.meta.sidecar_cache import (
+    read_sidecar_cache, sidecar_path, write_sidecar_cache)
+
+
+def write_sheet(path):
+    """Write a small metadata sheet."""
+    path.write_text('id,prompt\n0001,first\n0002,second\n0003,third\n',
+                    encoding='utf8')
+
+
+def test_index_is_cached_next_to_the_sheet(tmp_path, monkeypatch):
+    sheet = tmp_path / 'meta.csv'
+    write_sheet(sheet)
+    header, offsets = read_csv_index(sheet)
+    assert sidecar_path(sheet, CSV_INDEX_SUFFIX).is_file()
+
+    def fail(csv_meta_file):
+        raise AssertionError("The index should have been read from cache.")
+    monkeypatch.setattr(csv_meta, 'build_csv_index', fail)
+    assert read_csv_index(sheet) == (header, offsets)
+    assert read_csv_rows(sheet, ['0002'])['0002']['prompt'] == 'second'
+
+
+def test_rows_with_a_bom_and_multi_line_fields(tmp_path):
+    sheet = tmp_path / 'meta.csv'
+    sheet.write_bytes(
+        '\ufeffid,prompt,note\r\n'
+        '0001,first,"spans\r\ntwo lines"\r\n'
+        '0002,"say ""hi""",plain\r\n'
+        '0003,third,"one\nmore"\r\n'.encode('utf8'))
+
+    header, offsets = read_csv_index(sheet)
+    assert header == ['id', 'prompt', 'note']
+    assert list(offsets) == ['0001', '0002', '0003']
+
+    rows = read_csv_rows(sheet, ['0003', '0002', '0001', '9999'])
+    assert sorted(rows) == ['0001', '0002', '0003']
+    assert rows['0001']['note'] == 'spans\r\ntwo lines'
+    assert rows['0002']['prompt'] == 'say "hi"'
+    assert rows['0003'] == {'id': '0003', 'prompt': 'third',
+                            'note': 'one\nmore'}
+
+
+def test_concurrent_cache_writes_leave_a_valid_cache(tmp_path):
+    sheet = tmp_path / 'meta.csv'
+    write_sheet(sheet)
+    key, _ = read_sidecar_cache(sheet, CSV_INDEX_SUFFIX, CSV_INDEX_VERSION)
+    data = {'header': ['id', 'prompt'], 'offsets': {'0001': 10}}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in range(32):
+            executor.submit(
+                write_sidecar_cache, sheet, CSV_INDEX_SUFFIX, key, data)
+
+    assert read_sidecar_cache(
+        sheet, CSV_INDEX_SUFFIX, CSV_INDEX_VERSION) == (key, data)
+    assert [path.name for path in tmp_path.iterdir()
+            if path.name.endswith('.tmp')] == []
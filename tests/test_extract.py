@@ -0,0 +1,75 @@
+#
+# Copyright (c) 2022-2024 Pertti Palo.
+#
+# This file is part of Computer Assisted Segmentation Tools
+# (see https://github.com/giuthas-speech-research-tools/cast/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# The example data packaged with this program is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License. You should have received a
+# copy of the Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License along with the data. If not,
+# see <https://creativecommons.org/licenses/by-nc-sa/4.0/> for details.
+#
+"""Tests for extracting the TextGrids of individual recordings."""
+
+import csv
+
+from source.computer_assisted_segmentation_tools.extract import (
+    extract_textgrids)
+from source.computer_assisted_segmentation_tools.textgrid_io import (
+    TextGridArrays, TierArrays, read_textgrid, write_textgrid)
+
+
+def write_concatenation(results):
+    """Write the results csv and TextGrid of two concatenated recordings."""
+    with open(results.with_suffix('.csv'), 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile, quoting=csv.QUOTE_NONNUMERIC)
+        writer.writerow(['id', 'sliceBegin', 'sliceEnd'])
+        writer.writerow(['tok000', 0.0, 1.0])
+        writer.writerow(['tok001', 1.0, 2.0])
+    grid = TextGridArrays(xmin=0.0, xmax=2.0)
+    for name in ['Utterance', 'Word', 'Segments', 'Phonetic detail',
+                 'Notes']:
+        grid.add_tier(TierArrays.from_texts(
+            name, [0.0, 1.0], [1.0, 2.0], ['one', 'two'], xmax=2.0))
+    write_textgrid(grid, results.with_suffix('.TextGrid'))
+
+
+def test_standard_tiers_keep_their_extracted_names(tmp_path):
+    results = tmp_path / 'cat'
+    write_concatenation(results)
+    extracted = tmp_path / 'extracted'
+    extracted.mkdir()
+
+    extract_textgrids(extracted, results)
+
+    grid = read_textgrid(extracted / 'tok001.TextGrid')
+    assert list(grid.tiers) == [
+        'utterance', 'word', 'segment', 'Phonetic detail', 'Notes']
+    assert grid.tiers['word'].texts == ['two']
+
+
+def test_tier_selection_uses_concatenated_names(tmp_path):
+    results = tmp_path / 'cat'
+    write_concatenation(results)
+    extracted = tmp_path / 'extracted'
+    extracted.mkdir()
+
+    extract_textgrids(extracted, results, tier_names=['Word', 'Notes'])
+
+    grid = read_textgrid(extracted / 'tok000.TextGrid')
+    assert list(grid.tiers) == ['word', 'Notes']
@@ -0,0 +1,104 @@
+#
+# Copyright (c) 2022-2024 Pertti Palo.
+#
+# This file is part of Computer Assisted Segmentation Tools
+# (see https://github.com/giuthas-speech-research-tools/cast/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# The example data packaged with this program is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License. You should have received a
+# copy of the Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License along with the data. If not,
+# see <https://creativecommons.org/licenses/by-nc-sa/4.0/> for details.
+#
+"""Tests for reading and writing TextGrids with textgrid_io."""
+
+import os
+import stat
+
+import numpy as np
+import pytest
+from textgrids import TextGrid
+
+from source.computer_assisted_segmentation_tools.path_functions import UMASK
+from source.computer_assisted_segmentation_tools.textgrid_io import (
+    BINARY, TEXT_LONG, TEXT_SHORT, TextGridArrays, TierArrays, read_textgrid,
+    write_textgrid, write_textgrid_atomically)
+
+
+def make_grid() -> TextGridArrays:
+    """Make a small TextGrid with two interval tiers."""
+    grid = TextGridArrays(xmin=0.0, xmax=1.5)
+    grid.add_tier(TierArrays.from_texts(
+        'Utterance', [0.0, 0.5], [0.5, 1.5], ['', 'a "quoted" word'],
+        xmax=1.5))
+    grid.add_tier(TierArrays.from_texts(
+        'Word', [0.0, 0.5, 1.0], [0.5, 1.0, 1.5], ['', 'word', 'åäö'],
+        xmax=1.5))
+    grid.add_tier(TierArrays.from_texts(
+        'Beep', [0.25], [0.25], ['beep'], xmax=1.5, is_point_tier=True))
+    return grid
+
+
+def assert_same_grid(grid: TextGridArrays, other: TextGridArrays) -> None:
+    """Check that two TextGrids have the same tiers and elements."""
+    assert (grid.xmin, grid.xmax) == (other.xmin, other.xmax)
+    assert list(grid.tiers) == list(other.tiers)
+    for name, tier in grid.tiers.items():
+        other_tier = other.tiers[name]
+        assert tier.is_point_tier == other_tier.is_point_tier
+        assert (tier.xmin, tier.xmax) == (other_tier.xmin, other_tier.xmax)
+        np.testing.assert_array_equal(tier.begins, other_tier.begins)
+        np.testing.assert_array_equal(tier.ends, other_tier.ends)
+        assert tier.texts == other_tier.texts
+
+
+@pytest.mark.parametrize('file_format', [TEXT_LONG, TEXT_SHORT, BINARY])
+def test_round_trip(tmp_path, file_format):
+    path = tmp_path / 'test.TextGrid'
+    grid = make_grid()
+    write_textgrid(grid, path, file_format)
+    read_back = read_textgrid(path)
+    assert read_back.file_format == file_format
+    assert_same_grid(grid, read_back)
+
+
+def test_long_format_is_read_the_same_by_textgrids(tmp_path):
+    path = tmp_path / 'test.TextGrid'
+    grid = make_grid()
+    write_textgrid(grid, path, TEXT_LONG)
+    textgrid = TextGrid(str(path))
+    assert list(textgrid) == list(grid.tiers)
+    for name, tier in grid.tiers.items():
+        assert len(textgrid[name]) == len(tier.begins)
+    # textgrids does not unescape doubled quotes, so only the Word tier is
+    # compared label by label.
+    assert ([interval.text for interval in textgrid['Word']] ==
+            grid.tiers['Word'].texts)
+
+
+def test_atomic_write_uses_default_mode_for_new_files(tmp_path):
+    path = tmp_path / 'new.TextGrid'
+    write_textgrid_atomically(make_grid(), path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~UMASK
+
+
+def test_atomic_write_keeps_mode_of_existing_file(tmp_path):
+    path = tmp_path / 'existing.TextGrid'
+    path.write_text('')
+    os.chmod(path, 0o640)
+    write_textgrid_atomically(make_grid(), path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
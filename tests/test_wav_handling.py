@@ -0,0 +1,89 @@
+#
+# Copyright (c) 2022-2024 Pertti Palo.
+#
+# This file is part of Computer Assisted Segmentation Tools
+# (see https://github.com/giuthas-speech-research-tools/cast/).
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# The example data packaged with this program is licensed under the
+# Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License. You should have received a
+# copy of the Creative Commons Attribution-NonCommercial-ShareAlike 4.0
+# International (CC BY-NC-SA 4.0) License along with the data. If not,
+# see <https://creativecommons.org/licenses/by-nc-sa/4.0/> for details.
+#
+"""Tests for reading and writing wav files."""
+
+import numpy as np
+import pytest
+import scipy.io.wavfile as sio_wavfile
+
+from source.computer_assisted_segmentation_tools.wav_handling import (
+    WavWriter, probe_wav, read_wav_frames)
+
+
+def test_rf64_round_trip(tmp_path):
+    path = tmp_path / 'test.wav'
+    frames = np.arange(-1000, 1000, dtype=np.int16).reshape(-1, 2)
+    with WavWriter(path, 16000, 2, np.int16, rf64=True) as writer:
+        writer.write(frames[:300])
+        writer.write(frames[300:])
+
+    wav_info = probe_wav(path)
+    assert wav_info.rf64
+    assert wav_info.frame_count == 1000
+    assert wav_info.number_of_channels == 2
+    np.testing.assert_array_equal(read_wav_frames(wav_info), frames)
+
+
+@pytest.mark.parametrize('dtype', [np.int16, np.float32])
+def test_append(tmp_path, dtype):
+    path = tmp_path / 'test.wav'
+    first = (np.arange(501) - 250).astype(dtype)
+    second = (np.arange(333) * 3 - 500).astype(dtype)
+    sio_wavfile.write(path, 16000, first)
+
+    with WavWriter.open_for_append(probe_wav(path)) as writer:
+        writer.write(second)
+
+    samplerate, frames = sio_wavfile.read(path)
+    assert samplerate == 16000
+    np.testing.assert_array_equal(frames, np.concatenate((first, second)))
+    assert probe_wav(path).frame_count == len(first) + len(second)
+
+
+def test_int24_is_read_back_by_scipy(tmp_path):
+    path = tmp_path / 'test.wav'
+    # 24-bit samples are held left-justified in int32.
+    frames = (np.arange(-100, 101, dtype=np.int32) * 1000) << 8
+    with WavWriter(path, 16000, 1, 'int24') as writer:
+        writer.write(frames)
+
+    assert probe_wav(path).sample_format == 'int24'
+    np.testing.assert_array_equal(sio_wavfile.read(path)[1], frames)
+
+
+def test_failed_append_leaves_file_unchanged(tmp_path):
+    path = tmp_path / 'test.wav'
+    frames = np.arange(-500, 501, dtype=np.int16)
+    sio_wavfile.write(path, 16000, frames)
+    original = path.read_bytes()
+
+    with pytest.raises(RuntimeError):
+        with WavWriter.open_for_append(probe_wav(path)) as writer:
+            writer.write(frames)
+            raise RuntimeError("Failed while appending.")
+
+    assert path.read_bytes() == original